@@ -7,21 +7,28 @@ except ImportError:
     pass
     
 import streamlit as st
-import chromadb
-from transformers import pipeline
 from pathlib import Path
-import tempfile
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.backend.docling_parse_v2_backend import DoclingParseV2DocumentBackend
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
 import time
+import hashlib
 import random
+import re
+from collections import deque
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Heavy dependencies (chromadb, transformers, sentence_transformers, langchain,
+# plotly, docling) are imported where they are first needed so the first page
+# renders without paying for them. See bench_imports.py for measurements.
+import model_registry
+import health
+import retrieval
+import chunking
+import embedding_pool
+import dedup
+import doc_stats
+import history_store
+import conversion
 
 
 # Custom CSS for better appearance
@@ -549,40 +556,76 @@ def add_custom_css():
     """, unsafe_allow_html=True)
 
 
-# Convert uploaded file to markdown text
+# Convert a file on disk to markdown text (uploads go through conversion.convert_bytes)
 def convert_to_markdown(file_path: str) -> str:
-    path = Path(file_path)
-    ext = path.suffix.lower()
-
-    if ext == ".pdf":
-        pdf_opts = PdfPipelineOptions(do_ocr=False)
-        pdf_opts.accelerator_options = AcceleratorOptions(
-            num_threads=4,
-            device=AcceleratorDevice.CPU
-        )
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_options=pdf_opts,
-                    backend=DoclingParseV2DocumentBackend
-                )
-            }
-        )
-        doc = converter.convert(file_path).document
-        return doc.export_to_markdown(image_mode="placeholder")
-
-    if ext in [".doc", ".docx"]:
-        converter = DocumentConverter()
-        doc = converter.convert(file_path).document
-        return doc.export_to_markdown(image_mode="placeholder")
-
-    if ext == ".txt":
+    return conversion.convert_file(file_path)
+
+
+# Workspaces: each one gets its own collection ("shard"), so uploads and
+# resets in one workspace never touch another and queries only scan their own
+# corpus. The legacy shared collection is still called "documents".
+# Sessions start in a private "session-..." workspace; those are never listed
+# to anyone else.
+COLLECTION_PREFIX = "documents"
+WORKSPACE_SEPARATOR = "__"
+PRIVATE_WORKSPACE_PREFIX = "session-"
+MAX_COLLECTION_NAME = 63
+
+
+def workspace_collection(workspace: str) -> str:
+    """Collection name for a workspace (Chroma allows 3-63 chars of [a-zA-Z0-9._-])."""
+    slug = re.sub(r"[^a-zA-Z0-9._-]+", "-", (workspace or "").strip())
+    slug = re.sub(r"\.{2,}", ".", slug).strip("-._")
+    if not slug:
+        return COLLECTION_PREFIX
+    name = f"{COLLECTION_PREFIX}{WORKSPACE_SEPARATOR}{slug}"
+    if len(name) <= MAX_COLLECTION_NAME:
+        return name
+    # Too long: keep a readable head and disambiguate with a hash of the full name
+    suffix = "-" + hashlib.sha1(slug.encode("utf-8")).hexdigest()[:10]
+    head = name[:MAX_COLLECTION_NAME - len(suffix)].rstrip("-._")
+    return head + suffix
+
+
+def collection_workspace(collection_name: str) -> str:
+    """Inverse of workspace_collection for display."""
+    if collection_name == COLLECTION_PREFIX:
+        return "shared"
+    return collection_name[len(COLLECTION_PREFIX) + len(WORKSPACE_SEPARATOR):]
+
+
+def is_private_collection(collection_name: str) -> bool:
+    return collection_name.startswith(COLLECTION_PREFIX + WORKSPACE_SEPARATOR + PRIVATE_WORKSPACE_PREFIX)
+
+
+def list_workspace_collections(client, current=None):
+    """The shared collection and named workspaces, plus ``current``.
+
+    Other sessions' private workspaces are left out so nobody can search them.
+    """
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    return sorted(n for n in names
+                  if n == current
+                  or n == COLLECTION_PREFIX
+                  or (n.startswith(COLLECTION_PREFIX + WORKSPACE_SEPARATOR) and not is_private_collection(n)))
+
+
+def shard_stats(client, current=None):
+    """Per-shard sizes: chunks in the vector store and terms in the BM25 index."""
+    stats = []
+    for name in list_workspace_collections(client, current):
         try:
-            return path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            return path.read_text(encoding="latin-1", errors="replace")
-
-    raise ValueError(f"Unsupported extension: {ext}")
+            chunks = client.get_collection(name=name).count()
+        except Exception:
+            chunks = None
+        bm25_index = retrieval.get_bm25_index(name)
+        stats.append({
+            "workspace": collection_workspace(name),
+            "collection": name,
+            "chunks": chunks,
+            "bm25_terms": len(bm25_index.postings),
+        })
+    return stats
 
 
 # Reset ChromaDB collection
@@ -591,21 +634,95 @@ def reset_collection(client, collection_name: str):
         client.delete_collection(name=collection_name)
     except Exception:
         pass
+    # Drop state derived from the old collection (cached handle, BM25 index)
+    getattr(add_text_to_chromadb, 'collections', {}).pop(collection_name, None)
+    retrieval.reset_bm25_index(collection_name)
+    dedup.reset_index(collection_name)
     return client.create_collection(name=collection_name)
 
 
+# Chunkers: "markdown" is structure-aware and sized in embedding tokens,
+# "recursive" is the original character splitter. Defaults are (chunk_size, chunk_overlap).
+DEFAULT_CHUNKER = "markdown"
+CHUNKER_DEFAULTS = {
+    "markdown": (240, 32),   # tokens; all-MiniLM-L6-v2 embeds at most 256 word pieces
+    "recursive": (700, 100), # characters
+}
+
+
+def count_tokens(text: str) -> int:
+    """Length of ``text`` in embedding-model tokens."""
+    return len(model_registry.get_embedder().tokenizer.tokenize(text))
+
+
+def split_text(text: str, chunker: str = DEFAULT_CHUNKER, chunk_size=None, chunk_overlap=None):
+    """Yield chunk texts from ``text`` using the chosen chunker."""
+    default_size, default_overlap = CHUNKER_DEFAULTS[chunker]
+    chunk_size = chunk_size or default_size
+    chunk_overlap = default_overlap if chunk_overlap is None else chunk_overlap
+
+    if chunker == "recursive":
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", " ", ""]
+        )
+        yield from splitter.split_text(text)
+        return
+
+    for chunk in chunking.chunk_markdown(text, count_tokens, max_tokens=chunk_size,
+                                         overlap_tokens=chunk_overlap):
+        yield chunk["text"]
+
+
+def record_duplicates(collection, ids, metadatas, duplicates, filename):
+    """Flag each kept chunk as also coming from ``filename``, so file/type scopes still find it.
+
+    In merge mode the chunk also records how often, and from which files, it was repeated.
+    """
+    batch = dict(zip(ids, metadatas))
+    stored_ids = sorted({match for _, _, match in duplicates if match not in batch})
+    stored = {}
+    if stored_ids:
+        fetched = collection.get(ids=stored_ids, include=["metadatas"])
+        stored = {chunk_id: dict(meta or {}) for chunk_id, meta in zip(fetched["ids"], fetched["metadatas"])}
+
+    for _, _, match in duplicates:
+        metadata = batch.get(match) or stored.get(match)
+        if metadata is None:
+            continue
+        if metadata.get("filename") != filename:
+            metadata[retrieval.source_key(filename)] = True
+            metadata[retrieval.extension_key(Path(filename).suffix.lower())] = True
+        if dedup.MODE == "merge":
+            # Chroma metadata values must be scalars, so sources are a "|"-joined string
+            sources = set(filter(None, metadata.get("duplicate_sources", "").split("|")))
+            metadata["duplicate_sources"] = "|".join(sorted(sources | {filename}))
+            metadata["duplicate_count"] = metadata.get("duplicate_count", 0) + 1
+
+    if stored:
+        collection.update(ids=list(stored), metadatas=list(stored.values()))
+
+
 # Add text chunks to ChromaDB
-def add_text_to_chromadb(text: str, filename: str, collection_name: str = "documents"):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=700,
-        chunk_overlap=100,
-        separators=["\n\n", "\n", " ", ""]
-    )
-    chunks = splitter.split_text(text)
+# Chroma rejects very large add() calls, so big documents are written in slices
+CHROMA_ADD_BATCH = 1000
+
+
+def add_text_to_chromadb(text: str, filename: str, collection_name: str = "documents",
+                         chunk_size: int = None, chunk_overlap: int = None,
+                         chunker: str = DEFAULT_CHUNKER, ingested_at: float = None,
+                         stats: dict = None):
+    """Chunk, deduplicate, embed and store one document.
+
+    If ``stats`` is a dict it receives the chunk count and what dedup saved.
+    """
+    chunks = split_text(text, chunker, chunk_size, chunk_overlap)
 
     if not hasattr(add_text_to_chromadb, 'client'):
-        add_text_to_chromadb.client = chromadb.Client()
-        add_text_to_chromadb.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        add_text_to_chromadb.client = model_registry.get_vector_client()
         add_text_to_chromadb.collections = {}
 
     if collection_name not in add_text_to_chromadb.collections:
@@ -616,41 +733,271 @@ def add_text_to_chromadb(text: str, filename: str, collection_name: str = "docum
         add_text_to_chromadb.collections[collection_name] = collection
 
     collection = add_text_to_chromadb.collections[collection_name]
-
-    for i, chunk in enumerate(chunks):
-        embedding = add_text_to_chromadb.embedding_model.encode(chunk).tolist()
-
-        metadata = {
+    bm25_index = retrieval.get_bm25_index(collection_name)
+
+    chunks = list(chunks)
+    if not chunks:
+        return collection
+    ids = [f"{filename}_chunk_{i}" for i in range(len(chunks))]
+    # Scope filters in the Q&A tab match on filename, extension and ingested_at
+    ingested_at = ingested_at or time.time()
+    extension = Path(filename).suffix.lower()
+    metadatas = [
+        {
             "filename": filename,
             "chunk_index": i,
-            "chunk_size": len(chunk)
+            "chunk_size": len(chunk),
+            "extension": extension,
+            "ingested_at": ingested_at,
+            "content_hash": hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
         }
-
+        for i, chunk in enumerate(chunks)
+    ]
+
+    # Drop chunks that repeat something already stored (boilerplate, copied documents)
+    if dedup.MODE == "off":
+        keep, duplicates = list(range(len(chunks))), []
+    else:
+        keep, duplicates = dedup.get_index(collection_name).filter(ids, chunks)
+        if duplicates:
+            record_duplicates(collection, ids, metadatas, duplicates, filename)
+    if stats is not None:
+        stats.update({"chunks": len(chunks), "stored": len(keep), **dedup.summarize(chunks, duplicates)})
+    ids = [ids[i] for i in keep]
+    chunks = [chunks[i] for i in keep]
+    metadatas = [metadatas[i] for i in keep]
+    if not chunks:
+        return collection
+
+    # One batched encode per document; large documents go to the worker pool,
+    # and fall back to in-process encoding if the pool can't start or breaks
+    embeddings = embedding_pool.encode(chunks).tolist()
+
+    for start in range(0, len(chunks), CHROMA_ADD_BATCH):
+        end = start + CHROMA_ADD_BATCH
         collection.add(
-            embeddings=[embedding],
-            documents=[chunk],
-            metadatas=[metadata],
-            ids=[f"{filename}_chunk_{i}"]
+            embeddings=embeddings[start:end],
+            documents=chunks[start:end],
+            metadatas=metadatas[start:end],
+            ids=ids[start:end]
         )
+    # Keep the lexical index in step with the vector store
+    for chunk_id, chunk in zip(ids, chunks):
+        bm25_index.add(chunk_id, chunk)
 
     return collection
 
 
+# Generator model used by the Q&A tab (overridable by the load-test harness)
+GENERATOR_MODEL = model_registry.GENERATOR_MODEL
+
+# Retrieval settings for the Q&A tab; any key can be overridden per call
+RETRIEVAL_SETTINGS = {
+    "n_results": 3,              # passages sent to the generator
+    "distance_threshold": 1.5,   # no answer when no vector hit is closer than this...
+    "bm25_min_score": 1.0,       # ...and no lexical hit scores at least this
+    "fusion": "rrf",             # "vector", "bm25" or "rrf" (hybrid reciprocal rank fusion)
+    "candidates": 10,            # candidates taken from each retriever before fusion
+    "rrf_k": 60,
+    "vector_weight": 1.0,
+    "bm25_weight": 1.0,
+    "rerank": False,             # cross-encoder reranking of a wider candidate set
+    "rerank_candidates": 20,
+    "rerank_budget_ms": 300,     # fall back to the fused order when scoring takes longer
+    "rerank_batch_size": 8,
+    "context_token_budget": None,  # None = whatever the generator's input window leaves free
+    "mmr": True,                 # maximal marginal relevance over the top candidates
+    "mmr_candidates": 10,
+    "mmr_lambda": 0.7,           # 1.0 = pure relevance, 0.0 = pure diversity
+}
+
+
+def _record_ms(timings, key, started):
+    """Store elapsed milliseconds since ``started`` in ``timings`` (if given)."""
+    if timings is not None:
+        timings[key] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def embed_query(question):
+    """Query embedding from the same model used at ingest (the warmed-up SentenceTransformer)."""
+    return model_registry.get_embedder().encode(question).tolist()
+
+
+def retrieve_passages(collection, question, settings, timings=None, where=None, query_embedding=None):
+    """Rank chunks for a question with vector search, BM25 or both fused with RRF.
+
+    With MMR enabled every passage also carries its stored ``embedding``.
+    """
+    fusion = settings["fusion"]
+    pool = settings["n_results"] if fusion == "vector" else settings["candidates"]
+    if settings["rerank"]:
+        pool = max(pool, settings["rerank_candidates"])
+    if settings["mmr"]:
+        pool = max(pool, settings["mmr_candidates"])
+    with_embeddings = ["embeddings"] if settings["mmr"] else []
+    passages = {}
+    vector_ranking = []
+    bm25_ranking = []
+
+    if fusion in ("vector", "rrf"):
+        started = time.perf_counter()
+        if query_embedding is None:
+            query_embedding = embed_query(question)
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=pool,
+            where=where,
+            include=["documents", "metadatas", "distances"] + with_embeddings
+        )
+        embeddings = results["embeddings"][0] if with_embeddings else [None] * len(results["ids"][0])
+        for chunk_id, doc, meta, dist, embedding in zip(results["ids"][0], results["documents"][0],
+                                                        results["metadatas"][0], results["distances"][0],
+                                                        embeddings):
+            passages[chunk_id] = {"id": chunk_id, "document": doc, "metadata": meta,
+                                  "distance": dist, "bm25_score": None, "embedding": embedding}
+            vector_ranking.append(chunk_id)
+        _record_ms(timings, "vector_ms", started)
+
+    if fusion in ("bm25", "rrf"):
+        started = time.perf_counter()
+        # The BM25 index has no metadata, so a scope is applied as an allowed id set
+        allowed_ids = set(collection.get(where=where, include=[])["ids"]) if where else None
+        hits = retrieval.get_bm25_index(collection.name).search(question, n_results=pool,
+                                                                allowed_ids=allowed_ids)
+        missing = [chunk_id for chunk_id, _ in hits if chunk_id not in passages]
+        if missing:
+            fetched = collection.get(ids=missing, include=["documents", "metadatas"] + with_embeddings)
+            embeddings = fetched["embeddings"] if with_embeddings else [None] * len(fetched["ids"])
+            for chunk_id, doc, meta, embedding in zip(fetched["ids"], fetched["documents"],
+                                                      fetched["metadatas"], embeddings):
+                passages[chunk_id] = {"id": chunk_id, "document": doc, "metadata": meta,
+                                      "distance": None, "bm25_score": None, "embedding": embedding}
+        for chunk_id, score in hits:
+            if chunk_id in passages:
+                passages[chunk_id]["bm25_score"] = score
+                bm25_ranking.append(chunk_id)
+        _record_ms(timings, "bm25_ms", started)
+
+    started = time.perf_counter()
+    if fusion == "rrf":
+        fused = retrieval.reciprocal_rank_fusion(
+            [vector_ranking, bm25_ranking],
+            k=settings["rrf_k"],
+            weights=[settings["vector_weight"], settings["bm25_weight"]]
+        )
+        ranking = [chunk_id for chunk_id, _ in fused]
+    else:
+        ranking = vector_ranking or bm25_ranking
+    _record_ms(timings, "fusion_ms", started)
+
+    return [passages[chunk_id] for chunk_id in ranking]
+
+
+def retrieve_from_shards(collections, question, settings, timings=None, where=None, query_embedding=None):
+    """Query several workspace collections in parallel and merge their rankings.
+
+    Vector-only search merges by distance (one embedding model, so distances
+    are comparable); hybrid and BM25 scores are not, so shard rankings are
+    merged with reciprocal rank fusion. Passage ids are prefixed with the
+    collection name because chunk ids can repeat across workspaces.
+    """
+    def run(collection):
+        shard_timings = {}
+        started = time.perf_counter()
+        passages = retrieve_passages(collection, question, settings, shard_timings, where, query_embedding)
+        _record_ms(shard_timings, "total_ms", started)
+        for passage in passages:
+            passage["id"] = f"{collection.name}:{passage['id']}"
+            passage["shard"] = collection.name
+        return collection.name, passages, shard_timings
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(collections), 8)) as executor:
+        results = list(executor.map(run, collections))
+    _record_ms(timings, "shards_ms", started)
+
+    by_id = {p["id"]: p for _, passages, _ in results for p in passages}
+    if settings["fusion"] == "vector":
+        ranking = sorted(by_id, key=lambda i: by_id[i]["distance"])
+    else:
+        fused = retrieval.reciprocal_rank_fusion([[p["id"] for p in passages] for _, passages, _ in results],
+                                                 k=settings["rrf_k"])
+        ranking = [chunk_id for chunk_id, _ in fused]
+
+    if timings is not None:
+        timings["shards"] = {name: {"passages": len(passages), **shard_timings}
+                             for name, passages, shard_timings in results}
+    return [by_id[chunk_id] for chunk_id in ranking]
+
+
 # Q&A function
-def get_answer_with_source(collection, question):
-    """Get answer from documents based on current AI personality."""
-    # Query the collection
-    results = collection.query(
-        query_texts=[question],
-        n_results=3
-    )
-    
-    docs = results["documents"][0]
-    distances = results["distances"][0]
-    ids = results["ids"][0]
-    
-    if not docs or min(distances) > 1.5:
+def get_answer_with_source(collection, question, settings=None, timings=None, where=None):
+    """Get answer from documents based on current AI personality.
+
+    ``settings`` overrides RETRIEVAL_SETTINGS; if ``timings`` is a dict it is
+    filled with per-stage latencies in milliseconds. ``where`` is a Chroma
+    metadata filter that restricts the search (see ``retrieval.build_where``).
+    ``collection`` may also be a list of workspace collections to search together.
+    """
+    total_started = time.perf_counter()
+    settings = {**RETRIEVAL_SETTINGS, **(settings or {})}
+
+    # Embedded once and shared by vector search across every shard
+    query_embedding = None
+    if settings["fusion"] != "bm25":
+        query_embedding = embed_query(question)
+
+    if isinstance(collection, (list, tuple)):
+        ranked = retrieve_from_shards(collection, question, settings, timings, where, query_embedding)
+    else:
+        ranked = retrieve_passages(collection, question, settings, timings, where, query_embedding)
+
+    if settings["rerank"] and len(ranked) > 1:
+        started = time.perf_counter()
+        reranked, info = retrieval.rerank_with_budget(
+            model_registry.get_cross_encoder(),
+            question,
+            ranked[:settings["rerank_candidates"]],
+            top_k=settings["n_results"],
+            budget_ms=settings["rerank_budget_ms"],
+            batch_size=settings["rerank_batch_size"],
+        )
+        # Keep the rest of the candidates behind the reranked ones for the relevance gate
+        reranked_ids = {p["id"] for p in reranked}
+        ranked = reranked + [p for p in ranked if p["id"] not in reranked_ids]
+        _record_ms(timings, "rerank_ms", started)
+        if timings is not None:
+            timings["rerank_fallback"] = info["fallback"]
+
+    # Diversify: near-copies of one passage would otherwise fill all n_results slots
+    if settings["mmr"] and len(ranked) > settings["n_results"]:
+        started = time.perf_counter()
+        positions = [i for i, p in enumerate(ranked[:settings["mmr_candidates"]])
+                     if p.get("embedding") is not None]
+        candidates = [ranked[i] for i in positions]
+        if len(candidates) > settings["n_results"]:
+            # Relevance is the fused / reranked position, so exact-term BM25 hits and
+            # the cross-encoder's choice survive; cosine only measures redundancy
+            order = retrieval.maximal_marginal_relevance(
+                query_embedding,
+                [p["embedding"] for p in candidates],
+                k=settings["n_results"],
+                lambda_mult=settings["mmr_lambda"],
+                relevance=retrieval.rank_relevance([i + 1 for i in positions]),
+            )
+            selected = [candidates[i] for i in order]
+            selected_ids = {p["id"] for p in selected}
+            ranked = selected + [p for p in ranked if p["id"] not in selected_ids]
+        _record_ms(timings, "mmr_ms", started)
+
+    distances = [p["distance"] for p in ranked if p["distance"] is not None]
+    best_bm25 = max((p["bm25_score"] or 0.0 for p in ranked), default=0.0)
+    close_enough = distances and min(distances) <= settings["distance_threshold"]
+    if not ranked or not (close_enough or best_bm25 >= settings["bm25_min_score"]):
+        _record_ms(timings, "total_ms", total_started)
         return "I don't have information about that topic.", "No source"
+
+    top = ranked[:settings["n_results"]]
     
     # Get the current personality settings from session state
     personality = st.session_state.get('personality', {
@@ -659,12 +1006,10 @@ def get_answer_with_source(collection, question):
         "context": "focusing on accuracy and clarity"
     })
     
-    # Create context with relevant document snippets
-    context = "\n\n".join([f"Document {i+1}: {doc}" for i, doc in enumerate(docs)])
-    
-    # Generate a response prompt based on personality
-    prompt = f"""Based on the following context, provide a {personality['style']} answer,
-using a {personality['tone']} tone, {personality['context']}.
+    # Generate a response prompt based on personality. Every field is filled
+    # in one format() call, so braces in the question or context stay literal.
+    prompt_template = """Based on the following context, provide a {style} answer,
+using a {tone} tone, {focus}.
 
 Context:
 {context}
@@ -673,29 +1018,37 @@ Question: {question}
 
 Please provide a comprehensive answer based on the above context."""
 
-    # Use text generation instead of question-answering for more flexible responses
-    model = pipeline(
-        "text2text-generation",
-        model="google/flan-t5-base",  # Using a larger model for better responses
-        max_length=200,
-        temperature=0.7
-    )
+    def build_prompt(context):
+        return prompt_template.format(style=personality['style'], tone=personality['tone'],
+                                      focus=personality['context'], context=context, question=question)
+
+    # Use text generation instead of question-answering for more flexible responses.
+    # The pipeline is loaded on the first question and shared by the whole process.
+    model = model_registry.get_generator(GENERATOR_MODEL)
+
+    # Pack the best passages into what's left of the encoder window (flan-t5: 512
+    # tokens) instead of letting the tokenizer silently cut the prompt
+    started = time.perf_counter()
+    tokenizer = model.tokenizer
+    overhead = len(tokenizer.encode(build_prompt(""))) + 8
+    window = tokenizer.model_max_length if tokenizer.model_max_length < 100_000 else 512
+    budget = max(0, window - overhead)
+    if settings["context_token_budget"]:
+        budget = min(budget, settings["context_token_budget"])
+    context, context_stats = retrieval.pack_context(top, tokenizer, budget)
+    prompt = build_prompt(context)
+    _record_ms(timings, "context_ms", started)
+    if timings is not None:
+        timings["context"] = context_stats
     
     # Get the answer
-    response = model(prompt, max_length=200, num_return_sequences=1)
+    started = time.perf_counter()
+    response = model(prompt, max_length=200, num_return_sequences=1, temperature=0.7)
     answer = response[0]['generated_text'].strip()
+    _record_ms(timings, "generation_ms", started)
     
-    # Find the most relevant source document and its metadata
-    best_idx = 0
-    min_distance = distances[0]
-    for i, (doc, dist) in enumerate(zip(docs, distances)):
-        if dist < min_distance:
-            min_distance = dist
-            best_idx = i
-    
-    source_doc = docs[best_idx]
-    source_meta = results["metadatas"][0][best_idx]
-    source_filename = source_meta["filename"]
+    # The most relevant source is the top-ranked passage
+    source_filename = top[0]["metadata"]["filename"]
     
     # Format the answer based on personality
     formatted_answer = answer
@@ -711,27 +1064,34 @@ Please provide a comprehensive answer based on the above context."""
 
 {answer}"""
     
+    _record_ms(timings, "total_ms", total_started)
     return formatted_answer, source_filename
 
 
 # FEATURE: Search history
+# Searches shown in the session's own history panel; the full log is in history_store
+HISTORY_VIEW_SIZE = 10
+
+
 def add_to_search_history(question, answer, source):
-    """Add search to history."""
+    """Append a search to the persistent history and to this session's recent view."""
 
     if 'search_history' not in st.session_state:
-        st.session_state.search_history = []
+        st.session_state.search_history = deque(maxlen=HISTORY_VIEW_SIZE)
+    
+    ts = time.time()
+    history_store.get_store().append(question, answer, source,
+                                     session_id=st.session_state.get('history_id'),
+                                     workspace=st.session_state.get('workspace'), ts=ts)
     
-    # Add new search to beginning of list
-    st.session_state.search_history.insert(0, {
+    # Newest first; the deque drops the oldest entry itself
+    st.session_state.search_history.appendleft({
         'question': question,
         'answer': answer,
         'source': source,
-        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        'ts': ts,
+        'timestamp': datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
     })
-    
-    # Keep only last 10 searches
-    if len(st.session_state.search_history) > 10:
-        st.session_state.search_history = st.session_state.search_history[:10]
 
 
 def show_search_history():
@@ -812,6 +1172,29 @@ def enhanced_question_interface():
     return question, search_button, clear_button
 
 
+def show_scope_filters():
+    """Optional filters that narrow the search to some documents. Returns a Chroma where clause."""
+    docs = st.session_state.get('converted_docs', [])
+    with st.expander("🎯 Limit search to..."):
+        filenames = st.multiselect("Documents", sorted({doc['filename'] for doc in docs}))
+        extensions = st.multiselect(
+            "File types", sorted({Path(doc['filename']).suffix.lower() for doc in docs})
+        )
+
+        since = until = None
+        dates = [datetime.fromtimestamp(doc['ingested_at']).date() for doc in docs if doc.get('ingested_at')]
+        if dates:
+            first, last = min(dates), max(dates)
+            picked = st.date_input("Uploaded between", value=(first, last),
+                                   min_value=first, max_value=last)
+            # Only filter once the user narrows the range (a half-picked range is ignored)
+            if isinstance(picked, (list, tuple)) and len(picked) == 2 and tuple(picked) != (first, last):
+                since = datetime.combine(picked[0], datetime.min.time()).timestamp()
+                until = datetime.combine(picked[1], datetime.max.time()).timestamp()
+
+    return retrieval.build_where(filenames, extensions, since, until)
+
+
 def show_document_manager():
     """Display document manager interface."""
     
@@ -829,8 +1212,14 @@ def show_document_manager():
         col1, col2, col3 = st.columns([3, 1, 1])
         
         with col1:
+            stats = st.session_state.doc_stats.get(doc.get('doc_id')) or {}
             st.write(f"📄 {doc['filename']}")
-            st.write(f"   Words: {len(doc['content'].split())}")
+            details = [f"Words: {stats.get('words', doc.get('word_count', 0)):,}"]
+            if stats.get('chunks') is not None:
+                details.append(f"Chunks: {stats['chunks']}")
+            if stats.get('pages'):
+                details.append(f"Pages: {stats['pages']}")
+            st.write("   " + " · ".join(details))
         
         with col2:
             # Preview button
@@ -841,15 +1230,18 @@ def show_document_manager():
             # Delete button
             if st.button("Delete", key=f"delete_{i}"):
                 # Remove from session state
-                st.session_state.converted_docs.pop(i)
+                removed = st.session_state.converted_docs.pop(i)
+                st.session_state.doc_stats.remove(removed.get('doc_id'))
                 # Rebuild database
-                client = chromadb.Client()
+                client = model_registry.get_vector_client()
                 try:
-                    collection = client.delete_collection(name="documents")
-                    collection = client.create_collection(name="documents")
+                    collection_name = workspace_collection(st.session_state.workspace)
+                    collection = reset_collection(client, collection_name)
                     # Re-add remaining documents
                     for doc in st.session_state.converted_docs:
-                        add_text_to_chromadb(doc['content'], doc['filename'])
+                        add_text_to_chromadb(doc['content'], doc['filename'],
+                                             collection_name=collection_name,
+                                             ingested_at=doc.get('ingested_at'))
                 except Exception as e:
                     st.error(f"Error rebuilding database: {e}")
                 st.rerun()
@@ -871,92 +1263,39 @@ def show_document_analytics():
     if not st.session_state.converted_docs:
         st.info("Upload some documents to see analytics!")
         return
+
+    # pandas/Plotly are only imported once there is something to chart
+    import analytics
+
+    stats = st.session_state.doc_stats
+    docs_version = f"{stats.uid}:{stats.version}"
+    documents = analytics.documents_frame(docs_version, stats.documents.values())
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Document type distribution
-        file_types = {}
-        for doc in st.session_state.converted_docs:
-            ext = Path(doc['filename']).suffix.lower()
-            file_types[ext] = file_types.get(ext, 0) + 1
-        
-        fig = go.Figure(data=[go.Pie(
-            labels=list(file_types.keys()),
-            values=list(file_types.values()),
-            hole=.3,
-            marker_colors=['#2E7D32', '#43A047', '#66BB6A', '#81C784']
-        )])
-        fig.update_layout(title="Document Types Distribution")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(analytics.type_pie(docs_version, documents), use_container_width=True)
     
     with col2:
         # Document sizes comparison
-        doc_sizes = [{'name': doc['filename'], 'words': len(doc['content'].split())} 
-                    for doc in st.session_state.converted_docs]
-        doc_sizes.sort(key=lambda x: x['words'], reverse=True)
-        
-        fig = px.bar(
-            doc_sizes, 
-            x='name', 
-            y='words',
-            title="Document Sizes (Word Count)",
-            color_discrete_sequence=['#2E7D32']
-        )
-        fig.update_layout(xaxis_title="Document", yaxis_title="Word Count")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(analytics.size_bar(docs_version, documents), use_container_width=True)
     
     # Just keep the document type distribution and size comparison charts above
     
-    # Search patterns analysis
-    if 'search_history' in st.session_state and st.session_state.search_history:
+    # Search patterns analysis (all sessions, aggregated in SQLite)
+    store = history_store.get_store()
+    history_version = f"{store.path}:{store.version()}"
+    if store.version():
         st.subheader("🔍 Search Pattern Analysis")
+        sources, hours = analytics.search_aggregates(history_version, store)
         
         # Most referenced documents
-        doc_references = {}
-        for search in st.session_state.search_history:
-            doc_references[search['source']] = doc_references.get(search['source'], 0) + 1
-        
-        fig = px.bar(
-            x=list(doc_references.keys()),
-            y=list(doc_references.values()),
-            title="Most Referenced Documents in Q&A",
-            color_discrete_sequence=['#2E7D32']
-        )
-        fig.update_layout(
-            xaxis_title="Document",
-            yaxis_title="Times Referenced",
-            showlegend=False
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(analytics.source_bar(history_version, sources), use_container_width=True)
         
         # Show recent search patterns
         st.markdown("#### Recent Search Patterns")
-        searches_by_hour = {}
-        for search in st.session_state.search_history:
-            hour = datetime.strptime(search['timestamp'], "%Y-%m-%d %H:%M:%S").hour
-            searches_by_hour[hour] = searches_by_hour.get(hour, 0) + 1
-        
-        # Fill in missing hours with 0
-        for hour in range(24):
-            if hour not in searches_by_hour:
-                searches_by_hour[hour] = 0
-        
-        # Sort by hour
-        hours = sorted(searches_by_hour.keys())
-        counts = [searches_by_hour[hour] for hour in hours]
-        
-        fig = px.line(
-            x=hours,
-            y=counts,
-            title="Search Activity by Hour",
-            color_discrete_sequence=['#2E7D32']
-        )
-        fig.update_layout(
-            xaxis_title="Hour of Day",
-            yaxis_title="Number of Searches"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(analytics.hourly_line(history_version, hours), use_container_width=True)
     
     # Document statistics
     show_document_stats()
@@ -968,15 +1307,13 @@ def show_document_stats():
         st.info("No documents to analyze.")
         return
 
-    # Calculate stats with more detail
-    total_docs = len(st.session_state.converted_docs)
-    total_words = sum(len(doc['content'].split()) for doc in st.session_state.converted_docs)
-    avg_words = total_words // total_docs if total_docs > 0 else 0
-    
-    # Get word distribution
-    word_counts = [len(doc['content'].split()) for doc in st.session_state.converted_docs]
-    max_words = max(word_counts)
-    min_words = min(word_counts)
+    # Aggregates are kept up to date on add/delete; nothing is recounted here
+    summary = st.session_state.doc_stats.summary()
+    total_docs = summary['documents']
+    total_words = summary['total_words']
+    avg_words = summary['avg_words']
+    max_words = summary['max_words']
+    min_words = summary['min_words']
     
     # Display in columns with enhanced metrics
     st.markdown("""
@@ -994,12 +1331,17 @@ def show_document_stats():
     with col4:
         st.metric("Word Range", f"{min_words:,} - {max_words:,}")
     
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Chunks", f"{summary['total_chunks']:,}")
+    with col2:
+        st.metric("Total Tokens", f"{summary['total_tokens']:,}")
+    with col3:
+        st.metric("Total Size", f"{summary['total_bytes'] / 1024:,.1f} KB")
+    
     # Show breakdown by file type with visual enhancement
     st.markdown("### 📁 File Type Distribution")
-    file_types = {}
-    for doc in st.session_state.converted_docs:
-        ext = Path(doc['filename']).suffix.lower()
-        file_types[ext] = file_types.get(ext, 0) + 1
+    file_types = summary['by_extension']
     
     # Create a more visual representation
     for ext, count in file_types.items():
@@ -1034,38 +1376,32 @@ def safe_convert_files(uploaded_files):
                 continue
             
             # Check file type
-            allowed_extensions = ['.pdf', '.doc', '.docx', '.txt']
+            allowed_extensions = ['.pdf', '.doc', '.docx', '.pptx', '.txt']
             file_ext = Path(uploaded_file.name).suffix.lower()
             
             if file_ext not in allowed_extensions:
                 errors.append(f"{uploaded_file.name}: Unsupported file type")
                 continue
             
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-                tmp.write(uploaded_file.getvalue())
-                tmp_path = tmp.name
+            # Convert to markdown (in memory, or via a managed scratch file)
+            data = uploaded_file.getvalue()
+            markdown_content = conversion.convert_bytes(uploaded_file.name, data)
             
-            try:
-                # Convert to markdown
-                markdown_content = convert_to_markdown(tmp_path)
-                
-                # Validate content
-                if len(markdown_content.strip()) < 10:
-                    errors.append(f"{uploaded_file.name}: File appears to be empty or corrupted")
-                    continue
-                
-                # Store successful conversion
-                converted_docs.append({
-                    'filename': uploaded_file.name,
-                    'content': markdown_content,
-                    'size': len(uploaded_file.getvalue()),
-                    'word_count': len(markdown_content.split())
-                })
-                
-            finally:
-                # Always cleanup temp file
-                Path(tmp_path).unlink(missing_ok=True)
+            # Validate content
+            if len(markdown_content.strip()) < 10:
+                errors.append(f"{uploaded_file.name}: File appears to be empty or corrupted")
+                continue
+            
+            # Store successful conversion
+            converted_docs.append({
+                'filename': uploaded_file.name,
+                'content': markdown_content,
+                'size': len(data),
+                'word_count': len(markdown_content.split()),
+                'ingested_at': time.time(),
+                'doc_id': uuid.uuid4().hex,
+                'pages': doc_stats.count_pages(uploaded_file.name, data)
+            })
                 
         except Exception as e:
             errors.append(f"{uploaded_file.name}: {str(e)}")
@@ -1096,6 +1432,100 @@ def show_conversion_results(converted_docs, errors):
             st.write(f"• {error}")
 
 
+def show_retrieval_settings():
+    """Sidebar controls for hybrid search and reranking."""
+    if 'retrieval_settings' not in st.session_state:
+        st.session_state.retrieval_settings = dict(RETRIEVAL_SETTINGS)
+    settings = st.session_state.retrieval_settings
+
+    with st.sidebar.expander("🔧 Search Settings"):
+        fusion_modes = ["rrf", "vector", "bm25"]
+        settings["fusion"] = st.selectbox(
+            "Retrieval",
+            fusion_modes,
+            index=fusion_modes.index(settings["fusion"]),
+            format_func=lambda x: {"rrf": "Hybrid (keywords + meaning)",
+                                   "vector": "Meaning only",
+                                   "bm25": "Keywords only"}[x]
+        )
+        settings["mmr"] = st.checkbox("Diversify results (skip near-copies)", value=settings["mmr"])
+        if settings["mmr"]:
+            settings["mmr_lambda"] = st.slider(
+                "Relevance vs. diversity", 0.0, 1.0, settings["mmr_lambda"], step=0.05,
+                help="1.0 keeps the most relevant passages even if they repeat each other"
+            )
+        settings["rerank"] = st.checkbox("Rerank with cross-encoder", value=settings["rerank"])
+        if settings["rerank"]:
+            settings["rerank_budget_ms"] = st.slider(
+                "Rerank time budget (ms)", 50, 2000, settings["rerank_budget_ms"], step=50
+            )
+    return settings
+
+
+def show_workspace_selector():
+    """Sidebar workspace picker. Returns the collections the Q&A tab should search."""
+    if 'workspace' not in st.session_state:
+        # Private by default; type a shared name to work on the same knowledge base as others
+        st.session_state.workspace = f"{PRIVATE_WORKSPACE_PREFIX}{uuid.uuid4().hex[:16]}"
+        st.session_state.workspace_docs = {}
+        st.session_state.workspace_stats = {}
+
+    st.sidebar.markdown("### 🗂️ Workspace")
+    workspace = st.sidebar.text_input("Workspace", value=st.session_state.workspace,
+                                      help="Uploads, resets and questions stay inside this workspace")
+    st.session_state.workspace = workspace.strip() or st.session_state.workspace
+    # The rest of the app keeps using converted_docs; point it at this workspace's list
+    st.session_state.converted_docs = st.session_state.workspace_docs.setdefault(
+        st.session_state.workspace, []
+    )
+    st.session_state.doc_stats = st.session_state.workspace_stats.setdefault(
+        st.session_state.workspace, doc_stats.StatsStore()
+    )
+    current = workspace_collection(st.session_state.workspace)
+
+    # Only list other shards when the store is already open; never load it just for the sidebar
+    if not model_registry.is_ready(model_registry.vector_store_key()):
+        return [current]
+    client = model_registry.get_vector_client()
+    stats = shard_stats(client, current)
+    others = [row["collection"] for row in stats if row["collection"] != current]
+    extra = st.sidebar.multiselect("Also search", others, format_func=collection_workspace)
+
+    with st.sidebar.expander("📦 Workspace sizes"):
+        for row in stats:
+            marker = " (current)" if row["collection"] == current else ""
+            st.write(f"{row['workspace']}{marker}: {row['chunks']} chunks, {row['bm25_terms']} terms")
+
+    return [current] + extra
+
+
+def show_model_status():
+    """Show model warm-up / readiness status in the sidebar."""
+    warmup = model_registry.warmup_status()
+    icons = {"pending": "⏳", "running": "🔄", "ready": "✅", "failed": "❌"}
+
+    st.sidebar.markdown("### ⚙️ System Readiness")
+    if warmup["state"] == "idle":
+        st.sidebar.caption("Models load on first use (warm-up disabled).")
+        return
+
+    for name, component in warmup["components"].items():
+        line = f"{icons.get(component['status'], '•')} {name.replace('_', ' ').title()}"
+        if component["seconds"] is not None:
+            line += f" ({component['seconds']}s)"
+        st.sidebar.write(line)
+        if component["error"]:
+            st.sidebar.caption(component["error"])
+
+    if warmup["state"] == "running":
+        st.sidebar.info("Warming up models in the background - first answers may be slower.")
+        st.sidebar.button("🔄 Refresh status")
+    elif any(c["status"] == "failed" for c in warmup["components"].values()):
+        st.sidebar.warning("Some components failed to warm up; they will load on first use.")
+    else:
+        st.sidebar.success("All set - models are warm.")
+
+
 # MAIN APP
 def main():
     st.set_page_config(page_title="Simon's Personal AI Assistant", layout="wide")
@@ -1103,6 +1533,18 @@ def main():
     # Apply custom CSS
     add_custom_css()
 
+    # Preload models in the background once per process (set WARMUP_MODELS=0 to skip)
+    if model_registry.warmup_enabled():
+        model_registry.start_warmup(generator_model=GENERATOR_MODEL,
+                                    include_reranker=RETRIEVAL_SETTINGS["rerank"])
+    show_model_status()
+    search_collections = show_workspace_selector()
+    collection_name = search_collections[0]
+    retrieval_settings = show_retrieval_settings()
+
+    # Expose /livez and /readyz for an orchestrator when HEALTH_PORT is set
+    health.start_health_server()
+
     # Header with modern styling
     st.markdown("""
         <div style="text-align: center; padding: 2rem 0;">
@@ -1113,19 +1555,11 @@ def main():
         </div>
     """, unsafe_allow_html=True)
 
-    # Initialize session state
-    if 'converted_docs' not in st.session_state:
-        st.session_state.converted_docs = []
-
-    if 'collection' not in st.session_state:
-        client = chromadb.Client()
-        try:
-            st.session_state.collection = client.get_collection(name="documents")
-        except:
-            st.session_state.collection = client.create_collection(name="documents")
-            
+    # Initialize session state (converted_docs is set per workspace by show_workspace_selector)
     if 'search_history' not in st.session_state:
-        st.session_state.search_history = []
+        st.session_state.search_history = deque(maxlen=HISTORY_VIEW_SIZE)
+    if 'history_id' not in st.session_state:
+        st.session_state.history_id = uuid.uuid4().hex
     
     # Initialize active tab state
     if 'active_tab' not in st.session_state:
@@ -1149,9 +1583,9 @@ def main():
         st.header("📁 Document Upload & Conversion")
         uploaded_files = st.file_uploader(
             "Select documents to add to your knowledge base",
-            type=["pdf", "doc", "docx", "txt"],
+            type=["pdf", "doc", "docx", "pptx", "txt"],
             accept_multiple_files=True,
-            help="Supported formats: PDF, Word documents, and text files"
+            help="Supported formats: PDF, Word documents, PowerPoint decks, and text files"
         )
 
         if st.button("🚀 Convert & Add to Knowledge Base", type="primary"):
@@ -1160,12 +1594,29 @@ def main():
                     converted_docs, errors = safe_convert_files(uploaded_files)
                 
                 if converted_docs:
-                    client = chromadb.Client()
-                    collection = reset_collection(client, "documents")
+                    client = model_registry.get_vector_client()
+                    collection = reset_collection(client, collection_name)
+                    saved = {"embeddings_saved": 0, "bytes_saved": 0}
                     
                     for doc in converted_docs:
-                        collection = add_text_to_chromadb(doc['content'], doc['filename'])
+                        ingest_stats = {}
+                        collection = add_text_to_chromadb(doc['content'], doc['filename'],
+                                                          collection_name=collection_name,
+                                                          ingested_at=doc.get('ingested_at'),
+                                                          stats=ingest_stats)
                         st.session_state.converted_docs.append(doc)
+                        # Computed once here; the manager and Insights Lab only read them
+                        st.session_state.doc_stats.add(doc['doc_id'], doc_stats.document_stats(
+                            doc['filename'], doc['content'], size_bytes=doc['size'],
+                            pages=doc.get('pages'), chunks=ingest_stats.get('chunks'),
+                            tokens=count_tokens(doc['content']), words=doc['word_count']
+                        ))
+                        for key in saved:
+                            saved[key] += ingest_stats.get(key, 0)
+                    
+                    if saved["embeddings_saved"]:
+                        st.info(f"♻️ Skipped {saved['embeddings_saved']} duplicate chunks "
+                                f"({saved['bytes_saved'] / 1024:.1f} KB of text not embedded again)")
                     
                     # Show results
                     show_conversion_results(converted_docs, errors)
@@ -1182,6 +1633,7 @@ def main():
                 qa_container = st.container()
                 with qa_container:
                     question, search_button, clear_button = enhanced_question_interface()
+                    where = show_scope_filters()
                 
                 # Initialize session state for Q&A
                 if 'last_question' not in st.session_state:
@@ -1192,22 +1644,25 @@ def main():
                 # Remove any potential empty space
                 st.write("")
                 
-                client = chromadb.Client()
-                collection = client.get_collection(name="documents")
-                
                 answer_container = st.container()
                 
                 if search_button and question:
                     with st.spinner("🔍 Exploring your knowledge base..."):
                         try:
-                            client = chromadb.Client()
-                            collection = client.get_collection(name="documents")
-                            answer, source = get_answer_with_source(collection, question)
+                            client = model_registry.get_vector_client()
+                            collections = [client.get_collection(name=name) for name in search_collections]
+                            collection = collections[0] if len(collections) == 1 else collections
+                            timings = {}
+                            answer, source = get_answer_with_source(collection, question,
+                                                                   settings=retrieval_settings,
+                                                                   timings=timings,
+                                                                   where=where)
                             
                             # Store the results in session state
                             st.session_state.last_question = question
                             st.session_state.last_answer = answer
                             st.session_state.last_source = source
+                            st.session_state.last_timings = timings
                             
                             # Add to search history
                             add_to_search_history(question, answer, source)
@@ -1226,13 +1681,31 @@ def main():
                         
                         # Display the answer in the styled content box
                         st.markdown(f"<div class='answer-content'>{st.session_state.last_answer}</div>", unsafe_allow_html=True)
+
+                        # Per-stage latency of the last answer
+                        timings = st.session_state.get('last_timings') or {}
+                        if timings:
+                            st.caption(" · ".join(f"{stage.replace('_ms', '')}: {ms:.0f} ms"
+                                                  for stage, ms in timings.items()
+                                                  if stage.endswith('_ms')))
+                            context_stats = timings.get('context')
+                            if context_stats:
+                                st.caption(f"Context: {context_stats['tokens_used']}/{context_stats['budget']} tokens used, "
+                                           f"{context_stats['tokens_dropped']} dropped, "
+                                           f"{context_stats['duplicates_removed']} duplicate passages removed")
+                            if timings.get('rerank_fallback'):
+                                st.caption("Reranking ran over its time budget; showing search order.")
+                            for shard, shard_timings in (timings.get('shards') or {}).items():
+                                st.caption(f"{collection_workspace(shard)}: {shard_timings['passages']} passages "
+                                           f"in {shard_timings.get('total_ms', 0):.0f} ms")
                         
                         st.markdown("</div>", unsafe_allow_html=True)
             
             with history_col:
                 st.markdown("<div style='height: 4rem;'></div>", unsafe_allow_html=True)  # Spacing to align with question input
                 if clear_button:
-                    st.session_state.search_history = []
+                    # Clears this session's view; the shared history log is append-only
+                    st.session_state.search_history = deque(maxlen=HISTORY_VIEW_SIZE)
                     st.session_state.last_question = None
                     st.session_state.last_answer = None
                     st.session_state.last_source = None
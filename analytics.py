@@ -0,0 +1,97 @@
+"""Insights Lab data layer: pandas frames and memoized Plotly figures.
+
+Document stats are turned into a DataFrame once per data version and
+aggregated with vectorized pandas operations; search history is aggregated
+by the history store's indexed SQL queries. Every figure is cached under the
+version of the data it shows. A rerun with unchanged data
+therefore reuses the cached figures instead of rebuilding them.
+
+Versions are opaque strings such as "<store id>:<change counter>". Arguments
+with a leading underscore are not hashed by Streamlit, so the (possibly large)
+source objects never take part in the cache key; only the version does.
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+
+GREEN = "#2E7D32"
+PIE_COLORS = ["#2E7D32", "#43A047", "#66BB6A", "#81C784"]
+DOCUMENT_COLUMNS = ["filename", "extension", "words", "bytes", "pages", "chunks", "tokens"]
+
+
+# Frames
+@st.cache_resource(max_entries=16)
+def documents_frame(version, _records):
+    """One row per document from the stats store's records."""
+    return pd.DataFrame(list(_records), columns=DOCUMENT_COLUMNS)
+
+
+@st.cache_resource(max_entries=16)
+def search_aggregates(version, _store):
+    """(searches per source, searches per hour 0-23) from the history store's indexed queries."""
+    sources = pd.Series(dict(_store.source_counts()), dtype="int64")
+    hours = (pd.Series(dict(_store.hourly_counts()), dtype="int64")
+             .reindex(range(24), fill_value=0))
+    return sources, hours
+
+
+# Aggregations
+def type_distribution(documents):
+    return documents["extension"].value_counts()
+
+
+def document_sizes(documents):
+    return documents[["filename", "words"]].sort_values("words", ascending=False)
+
+
+# Figures - treat the returned objects as read-only, they are shared across reruns
+@st.cache_resource(max_entries=32)
+def type_pie(version, _documents):
+    counts = type_distribution(_documents)
+    fig = go.Figure(data=[go.Pie(
+        labels=counts.index.tolist(),
+        values=counts.tolist(),
+        hole=.3,
+        marker_colors=PIE_COLORS
+    )])
+    fig.update_layout(title="Document Types Distribution")
+    return fig
+
+
+@st.cache_resource(max_entries=32)
+def size_bar(version, _documents):
+    fig = px.bar(
+        document_sizes(_documents),
+        x='filename',
+        y='words',
+        title="Document Sizes (Word Count)",
+        color_discrete_sequence=[GREEN]
+    )
+    fig.update_layout(xaxis_title="Document", yaxis_title="Word Count")
+    return fig
+
+
+@st.cache_resource(max_entries=32)
+def source_bar(version, _sources):
+    fig = px.bar(
+        x=_sources.index.tolist(),
+        y=_sources.tolist(),
+        title="Most Referenced Documents in Q&A",
+        color_discrete_sequence=[GREEN]
+    )
+    fig.update_layout(xaxis_title="Document", yaxis_title="Times Referenced", showlegend=False)
+    return fig
+
+
+@st.cache_resource(max_entries=32)
+def hourly_line(version, _hours):
+    fig = px.line(
+        x=_hours.index.tolist(),
+        y=_hours.tolist(),
+        title="Search Activity by Hour",
+        color_discrete_sequence=[GREEN]
+    )
+    fig.update_layout(xaxis_title="Hour of Day", yaxis_title="Number of Searches")
+    return fig
@@ -7,60 +7,90 @@ except ImportError:
     pass
 
 # Simple Q&A App using Streamlit
-# Students: Replace the documents below with your own!
+# Students: Replace the documents in packs/om_knowledge with your own!
 
 # IMPORTS - These are the libraries we need
 import streamlit as st          # Creates web interface components
 import chromadb                # Stores and searches through documents  
 from transformers import pipeline  # AI model for generating answers
+import dedup                   # Finds repeated documents so we only store them once
+import docpack                 # Loads our documents from a "document pack" folder or .zip
+import os
+from pathlib import Path
 
+# Where our documents come from. Set DOC_PACK to use another pack (or a .zip)
+# without changing any code.
+PACK_PATH = os.environ.get("DOC_PACK", str(Path(__file__).parent / "packs" / "om_knowledge"))
+# The embedding model behind Chroma's default embedding function (all-MiniLM-L6-v2)
+PACK_EMBEDDER = "chroma-default"
+
+# @st.cache_resource runs this function once per server process and then
+# reuses the result, so button clicks and typing don't rebuild the database
+@st.cache_resource
 def setup_documents():
     """
     This function creates our document database
-    NOTE: This runs every time someone uses the app
-    In a real app, you'd want to save this data permanently
+    NOTE: Cached - it only runs once per process, not on every rerun
     """
+    # STUDENT TASK: Replace these documents with your own!
+    # Pick ONE topic: movies, sports, cooking, travel, technology
+    # Each document should be 150-200 words
+    # IMPORTANT: The quality of your documents affects answer quality!
+    #
+    # The documents live in a "document pack" (packs/om_knowledge) instead of
+    # this file, so you can change them without touching the code. Rebuild it with:
+    #   python docpack.py build --source my_docs.jsonl --output packs/om_knowledge
+    # Add --embedder chroma-default to store ready-made embeddings in the pack.
+    pack = docpack.load(PACK_PATH)
+    my_documents = pack.texts
+    
+    # Skip documents that repeat one we already have (doc2 and doc3 share the
+    # same text). A copy would be embedded again and take a second top-3 slot.
+    keep, dedup_stats = dedup.deduplicate(my_documents)
+
+    # ChromaDB needs unique identifiers for each document (the pack provides them)
+    documents = [my_documents[i] for i in keep]
+    ids = [pack.ids[i] for i in keep]
+    metadatas = [pack.metadatas[i] for i in keep]
+    fingerprint = docpack.text_fingerprint(ids, documents)
+
+    # Reuse the stored collection if it already holds exactly these documents:
+    # adding them again would re-embed every document for nothing.
+    # The fingerprint changes whenever any document or id changes.
     client = chromadb.Client()
     try:
         collection = client.get_collection(name="docs")
+        if ((collection.metadata or {}).get("fingerprint") == fingerprint
+                and collection.count() == len(ids)):
+            return collection, dedup_stats
+        # The documents changed - start over so old text doesn't linger
+        client.delete_collection(name="docs")
     except Exception:
-        collection = client.create_collection(name="docs")
+        pass
+    collection = client.create_collection(name="docs", metadata={"fingerprint": fingerprint})
 
+    # Add documents to database with unique IDs.
+    # If the pack already has embeddings made by the same model Chroma uses,
+    # we hand them over and Chroma has nothing left to compute.
+    # The pack's embeddings are memory-mapped: only the rows we use are read.
+    # The pack records the exact model (name, version and size of its vectors),
+    # so embeddings from a different model are never mixed with Chroma's.
+    embeddings = pack.embeddings_for(PACK_EMBEDDER)
+    if embeddings is None:
+        # The pack has no matching embeddings: compute them once into a cache
+        # folder (outside the pack), so later cold starts skip this step
+        try:
+            embeddings = docpack.cached_embeddings(pack, PACK_EMBEDDER)
+        except Exception:
+            # No model download or no writable cache: let Chroma embed as usual
+            embeddings = None
+    if embeddings is not None:
+        collection.add(documents=documents, ids=ids, metadatas=metadatas,
+                       embeddings=embeddings[keep].tolist())
+    else:
+        collection.add(documents=documents, ids=ids, metadatas=metadatas)
     
-    # STUDENT TASK: Replace these 5 documents with your own!
-    # Pick ONE topic: movies, sports, cooking, travel, technology
-    # Each document should be 150-200 words
-    # IMPORTANT: The quality of your documents affects answer quality!
-    
-    my_documents = [
-        """Olympique de Marseille - History and Legacy: This document is about the French football club OM and its history. Olympique de Marseille, founded in 1899, stands as France's most successful club in European competition and the only French team to win the Champions League. Their historic triumph came in 1993 when they defeated AC Milan 1-0 at Munich's Olympiastadion, with Basile Boli scoring the decisive goal.
-The club's golden era spanned the late 1980s and early 1990s under president Bernard Tapie, who assembled a star-studded squad including Jean-Pierre Papin, Didier Deschamps, and Chris Waddle. However, this period was later tainted by the match-fixing scandal that led to their relegation to Ligue 2 in 1994.
-OM has won Ligue 1 ten times, with their most recent title in 2010. The club's motto "Droit au But" (Straight to Goal) reflects their attacking philosophy. Despite financial struggles in recent decades, Marseille remains France's second-most supported club after Paris Saint-Germain, with a passionate fanbase known as the "Dodgers" who create an intimidating atmosphere at the Stade Vélodrome.""",
-"""Le Classique and Historic Rivalries: This document is about Olympique the Marseille and their biggest rivals. Olympique de Marseille's recent transfer activity reflects their financial constraints and strategic player development approach. Between 2020-2024, OM generated approximately €180 million in player sales while spending €120 million on acquisitions, maintaining a positive transfer balance crucial for Financial Fair Play compliance.
-Major departures include Boubacar Kamara to Aston Villa (€15 million, 2022), Morgan Sanson to Aston Villa (€16 million, 2021), and Duje Ćaleta-Car to Southampton (€12 million, 2023). These sales demonstrate OM's ability to develop talent and capitalize on market value increases.
-Significant acquisitions include Alexis Sánchez (free transfer, 2022), Mattéo Guendouzi (€11 million from Arsenal, 2022), and Jonathan Clauss (€7.5 million from RC Lens, 2022). The club's strategy emphasizes free transfers and loan deals, with approximately 40% of recent signings arriving without transfer fees.
-Academy graduates represent crucial assets, with players like Boubacar Kamara and Bamba Dieng generating pure profit when sold. OM typically maintains 6-8 loanees annually, developing young talents while managing squad costs. The average age of new signings has decreased from 26.8 years (2020) to 24.1 years (2024), reflecting a youth-focused recruitment strategy designed for long-term sustainability.""",
-"""Transfer Market Activity and Player Trading Statistics: This document is about the transfer activity of Olympique de Marseille (OM). Olympique de Marseille's recent transfer activity reflects their financial constraints and strategic player development approach. Between 2020-2024, OM generated approximately €180 million in player sales while spending €120 million on acquisitions, maintaining a positive transfer balance crucial for Financial Fair Play compliance.
-Major departures include Boubacar Kamara to Aston Villa (€15 million, 2022), Morgan Sanson to Aston Villa (€16 million, 2021), and Duje Ćaleta-Car to Southampton (€12 million, 2023). These sales demonstrate OM's ability to develop talent and capitalize on market value increases.
-Significant acquisitions include Alexis Sánchez (free transfer, 2022), Mattéo Guendouzi (€11 million from Arsenal, 2022), and Jonathan Clauss (€7.5 million from RC Lens, 2022). The club's strategy emphasizes free transfers and loan deals, with approximately 40% of recent signings arriving without transfer fees.
-Academy graduates represent crucial assets, with players like Boubacar Kamara and Bamba Dieng generating pure profit when sold. OM typically maintains 6-8 loanees annually, developing young talents while managing squad costs. The average age of new signings has decreased from 26.8 years (2020) to 24.1 years (2024), reflecting a youth-focused recruitment strategy designed for long-term sustainability.""",
-"""Ligue 1 Analytics and Marseille's Performance Metrics: This document is about the statistics of Olympique de Marseille. Ligue 1 has embraced advanced analytics, with Marseille consistently ranking among the top clubs in several key performance indicators. In recent seasons, OM typically ranks second or third in expected goals (xG), demonstrating their attacking intent despite not always converting chances efficiently.
-Marseille's pressing intensity averages among Ligue 1's highest, with approximately 23.5 pressures per possession lost, reflecting their aggressive off-ball approach. The Stade Vélodrome advantage becomes evident in home/away performance splits - OM typically gains 1.8 points per home game versus 1.2 away, among the league's largest differentials.
-Set-piece efficiency represents another strength, with Marseille scoring approximately 15-20% of their goals from dead ball situations, largely due to Dimitri Payet's delivery. Defensively, their high line results in fewer clearances per game (18.2) but more interceptions in the attacking third (4.1 per match).
-Financial Fair Play considerations impact squad building, with OM's wage-to-revenue ratio hovering around 70%, necessitating careful squad management. Youth development remains crucial, with academy graduates contributing approximately 25% of first-team minutes, highlighting the pathway from La Commanderie training center to professional football.""",
-"""Stade Vélodrome - Fortress of the Mediterranean: This document is about the stadium of Olympique de Marseille. The Stade Vélodrome, inaugurated in 1937, serves as one of Europe's most atmospheric stadiums and Marseille's spiritual home. With a current capacity of 67,394 following extensive renovations for Euro 2016, it ranks as France's second-largest stadium after the Stade de France.
-The stadium's most iconic feature is the "Virage Sud" (South Stand), where Marseille's most passionate supporters, including the Ultras groups like "South Winners" and "Fanatics," create a wall of sound that intimidates visiting teams. The famous "Aux Armes" chant, adapted from La Marseillaise, echoes throughout the stadium, creating an almost religious atmosphere during important matches.
-Architecturally, the Vélodrome underwent a €267 million renovation that transformed it into a modern arena while preserving its intimidating atmosphere. The distinctive undulating roof design reflects the Mediterranean waves, symbolizing Marseille's maritime heritage. The stadium has hosted major international events, including 1998 World Cup matches, Euro 2016 fixtures, and serves as a regular venue for France national team matches, cementing its status as a cathedral of French football."""
-    ]
-    
-    # Add documents to database with unique IDs
-    # ChromaDB needs unique identifiers for each document
-    collection.add(
-        documents=my_documents,
-        ids=["doc1", "doc2", "doc3", "doc4", "doc5"]
-    )
-    
-    return collection
+    return collection, dedup_stats
 
 def get_answer(collection, question):
     """
@@ -174,7 +204,7 @@ st.write("Welcome to the Olympique de Marseille database! Ask me anything about
 # STREAMLIT BUILDING BLOCK 3: FUNCTION CALLS
 # We call our function to set up the document database
 # This happens every time someone uses the app
-collection = setup_documents()
+collection, dedup_stats = setup_documents()
 
 # STREAMLIT BUILDING BLOCK 4: TEXT INPUT BOX
 # st.text_input() creates a box where users can type
@@ -262,6 +292,9 @@ st.sidebar.markdown("### 🔵 OM Quick Facts")
 st.sidebar.info("🏆 Champions League: 1993")
 st.sidebar.info("🏟️ Stadium: Stade Vélodrome")
 st.sidebar.info("👥 Capacity: 67,394")
+if dedup_stats["embeddings_saved"]:
+    st.sidebar.caption(f"♻️ {dedup_stats['embeddings_saved']} duplicate document(s) skipped "
+                       f"({dedup_stats['bytes_saved'] / 1024:.1f} KB not embedded)")
 
 
 
@@ -0,0 +1,165 @@
+"""Measure conversion time per format: the app's path vs. plain docling.
+
+For each file the app's path (conversion.convert_bytes: fast-path DOCX/PPTX
+extraction, adaptive PDF pipelines, in-memory text) is timed against the
+docling converter the apps used before (default DocumentConverter for Office
+files, the "tables" PDF pipeline for PDFs). Converters are loaded and warmed
+up before timing, so only steady-state conversion is measured.
+
+Examples:
+    python bench_conversion.py                      # synthetic memos and decks
+    python bench_conversion.py --corpus uploads/ --repeats 3 --report conversion.json
+    python bench_conversion.py --no-docling         # fast path only (docling not installed)
+
+Without ``--corpus`` it generates plain TXT, DOCX and PPTX memos with
+python-docx / python-pptx; PDFs are only benchmarked from a corpus.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from io import BytesIO
+from pathlib import Path
+
+import conversion
+import fast_extract
+import model_registry
+
+
+VOCABULARY = ("transfer fee club player season contract league goal million report "
+              "analysis market value window loan striker midfield defender keeper").split()
+
+
+def _sentence(rng, words=14):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_files(count, seed=0):
+    """(name, bytes) memos: a title, a few headed sections, a bullet list and a small table."""
+    from docx import Document
+    from pptx import Presentation
+
+    rng = random.Random(seed)
+    files = []
+    for i in range(count):
+        sections = [(f"Section {s + 1}", [_sentence(rng) for _ in range(rng.randint(3, 8))]) for s in range(4)]
+
+        text = "\n\n".join(f"{heading}\n\n" + " ".join(body) for heading, body in sections)
+        files.append((f"memo{i}.txt", text.encode("utf-8")))
+
+        document = Document()
+        document.add_heading(f"Memo {i}", 0)
+        for heading, body in sections:
+            document.add_heading(heading, 1)
+            document.add_paragraph(" ".join(body))
+        for item in body[:3]:
+            document.add_paragraph(item, style="List Bullet")
+        table = document.add_table(rows=3, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = rng.choice(VOCABULARY)
+        buffer = BytesIO()
+        document.save(buffer)
+        files.append((f"memo{i}.docx", buffer.getvalue()))
+
+        deck = Presentation()
+        for heading, body in sections:
+            slide = deck.slides.add_slide(deck.slide_layouts[1])
+            slide.shapes.title.text = heading
+            frame = slide.placeholders[1].text_frame
+            frame.text = body[0]
+            for line in body[1:]:
+                frame.add_paragraph().text = line
+        buffer = BytesIO()
+        deck.save(buffer)
+        files.append((f"deck{i}.pptx", buffer.getvalue()))
+    return files
+
+
+def corpus_files(corpus, limit):
+    files = []
+    for path in sorted(Path(corpus).rglob("*")):
+        if path.suffix.lower() in conversion.SUPPORTED_EXTENSIONS:
+            files.append((path.name, path.read_bytes()))
+        if len(files) >= limit:
+            break
+    return files
+
+
+def docling_baseline(name, data):
+    """The pre-fast-path conversion: docling for everything except .txt."""
+    ext = Path(name).suffix.lower()
+    if ext == ".txt":
+        return conversion.decode_text(data)
+    from docling.datamodel.base_models import DocumentStream
+
+    converter = (model_registry.get_pdf_converter() if ext == ".pdf"
+                 else model_registry.get_default_converter())
+    result = converter.convert(DocumentStream(name=name, stream=BytesIO(data)))
+    return result.document.export_to_markdown(image_mode="placeholder")
+
+
+def best_time(convert, name, data, repeats):
+    convert(name, data)  # warm-up: converter loading and first-call setup
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        convert(name, data)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conversion time per format: fast path vs. docling.")
+    parser.add_argument("--corpus", help="Directory of PDF/DOCX/PPTX/TXT files (default: synthetic memos)")
+    parser.add_argument("--files", type=int, default=20, help="Synthetic memos per format, or corpus file limit")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--no-docling", action="store_true", help="Skip the docling baseline")
+    parser.add_argument("--report", help="Optional JSON output path")
+    args = parser.parse_args(argv)
+
+    files = corpus_files(args.corpus, args.files) if args.corpus else synthetic_files(args.files)
+    print(f"{len(files)} files, {model_registry.available_cores()} cores")
+
+    per_format = defaultdict(lambda: {"files": 0, "bytes": 0, "fast_path": 0, "app_seconds": 0.0,
+                                      "docling_seconds": 0.0 if not args.no_docling else None})
+    for name, data in files:
+        ext = Path(name).suffix.lower()
+        stats = per_format[ext]
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+        if ext == ".txt" or fast_extract.extract(name, data) is not None:
+            stats["fast_path"] += 1
+        stats["app_seconds"] += best_time(conversion.convert_bytes, name, data, args.repeats)
+        if not args.no_docling:
+            stats["docling_seconds"] += best_time(docling_baseline, name, data, args.repeats)
+
+    print(f"{'format':>6} {'files':>5} {'fast':>5} {'app ms/file':>12} {'docling ms/file':>16} {'speedup':>8}")
+    results = []
+    for ext, stats in sorted(per_format.items()):
+        app_ms = stats["app_seconds"] * 1000 / stats["files"]
+        docling_ms = stats["docling_seconds"] * 1000 / stats["files"] if stats["docling_seconds"] is not None else None
+        speedup = docling_ms / app_ms if docling_ms and app_ms else None
+        results.append({"format": ext, "files": stats["files"], "bytes": stats["bytes"],
+                        "fast_path_files": stats["fast_path"], "app_ms_per_file": round(app_ms, 2),
+                        "docling_ms_per_file": round(docling_ms, 2) if docling_ms is not None else None,
+                        "speedup": round(speedup, 1) if speedup else None})
+        shown_docling = f"{docling_ms:>16.1f}" if docling_ms is not None else f"{'-':>16}"
+        shown_speedup = f"{speedup:>7.1f}x" if speedup else f"{'-':>8}"
+        print(f"{ext:>6} {stats['files']:>5} {stats['fast_path']:>5} {app_ms:>12.2f} {shown_docling} {shown_speedup}")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps({
+            "python": sys.version.split()[0],
+            "cores": os.cpu_count(),
+            "corpus": args.corpus,
+            "repeats": args.repeats,
+            "results": results,
+        }, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Measure embedding throughput (chunks/sec) as encode workers are added.
+
+Chunks come from the documents under ``--corpus`` (split with the app's
+default chunker) or, without a corpus, from synthetic text. Every worker
+count gets a fresh pool that is warmed up before timing, so model loading
+is excluded and only steady-state encoding is measured.
+
+Examples:
+    python bench_embeddings.py --workers 0,1,2,4,8,16
+    python bench_embeddings.py --corpus docs/ --threads-per-worker 2 --report embed_scaling.json
+
+Workers 0 is the in-process baseline (one batched ``encode`` call).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import embedding_pool
+import model_registry
+
+
+def load_chunks(corpus, limit):
+    import Simonhomework
+
+    chunks = []
+    for path in sorted(Path(corpus).rglob("*")):
+        if path.suffix.lower() in (".txt", ".md"):
+            chunks.extend(Simonhomework.split_text(path.read_text(encoding="utf-8", errors="ignore"),
+                                                   Simonhomework.DEFAULT_CHUNKER))
+        if len(chunks) >= limit:
+            break
+    return chunks[:limit]
+
+
+def synthetic_chunks(count, words=150, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ("transfer fee club player season contract league goal million report "
+                  "analysis market value window loan striker midfield defender keeper").split()
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+
+def measure(chunks, workers, threads, shard_size, repeats):
+    """Best-of-``repeats`` seconds to embed ``chunks`` with ``workers`` processes."""
+    if workers <= 0:
+        embedder = model_registry.get_embedder()
+        encode = lambda: embedder.encode(chunks, batch_size=embedding_pool.ENCODE_BATCH_SIZE)
+        pool = None
+    else:
+        pool = embedding_pool.EmbeddingPool(workers, threads, shard_size=shard_size)
+        pool.warm()
+        encode = lambda: pool.encode(chunks)
+
+    try:
+        encode()  # first call pays for tokenizer / graph setup
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            encode()
+            timings.append(time.perf_counter() - started)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embedding throughput vs. worker count.")
+    parser.add_argument("--workers", default="0,1,2,4,8")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="Default: cores // workers")
+    parser.add_argument("--shard-size", type=int, default=embedding_pool.SHARD_SIZE)
+    parser.add_argument("--chunks", type=int, default=4096)
+    parser.add_argument("--corpus", help="Directory of .txt/.md files to chunk (default: synthetic text)")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--report", help="Optional JSON output path")
+    args = parser.parse_args(argv)
+
+    chunks = load_chunks(args.corpus, args.chunks) if args.corpus else synthetic_chunks(args.chunks)
+    print(f"{len(chunks)} chunks, {model_registry.available_cores()} cores")
+    print(f"{'workers':>7} {'threads':>7} {'seconds':>8} {'chunks/s':>9} {'speedup':>8}")
+
+    results = []
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        threads = args.threads_per_worker or embedding_pool.configured_threads(workers)
+        seconds = measure(chunks, workers, threads, args.shard_size, args.repeats)
+        rate = len(chunks) / seconds
+        baseline = baseline or rate
+        results.append({"workers": workers, "threads_per_worker": threads if workers > 0 else None,
+                        "seconds": round(seconds, 3), "chunks_per_second": round(rate, 1),
+                        "speedup": round(rate / baseline, 2)})
+        shown_threads = threads if workers > 0 else "-"
+        print(f"{workers:>7} {shown_threads:>7} {seconds:>8.2f} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps({
+            "python": sys.version.split()[0],
+            "cores": model_registry.available_cores(),
+            "chunks": len(chunks),
+            "shard_size": args.shard_size,
+            "results": results,
+        }, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
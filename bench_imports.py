@@ -0,0 +1,110 @@
+"""Measure import-time cost of the apps and their heavy dependencies.
+
+Each import is timed in a fresh interpreter so module caches from earlier
+measurements don't hide the cost. Use it to check that the app modules stay
+cheap to import and to see what the first conversion, question or chart pays
+for on top.
+
+Examples:
+    python bench_imports.py
+    python bench_imports.py --repeats 5 --report import_times.json
+    python bench_imports.py --importtime Simonhomework    # per-module breakdown
+
+Run it before and after touching imports in the apps: Simonhomework should
+stay close to the cost of importing streamlit alone, with the heavy libraries
+only showing up in their own rows.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+# (label, import statement)
+TARGETS = [
+    ("streamlit", "import streamlit"),
+    ("chromadb", "import chromadb"),
+    ("transformers.pipeline", "from transformers import pipeline"),
+    ("sentence_transformers", "from sentence_transformers import SentenceTransformer"),
+    ("langchain.text_splitter", "from langchain.text_splitter import RecursiveCharacterTextSplitter"),
+    ("plotly.express", "import plotly.express"),
+    ("plotly.graph_objects", "import plotly.graph_objects"),
+    ("docling.document_converter", "from docling.document_converter import DocumentConverter"),
+    ("docling.pipeline_options", "from docling.datamodel.pipeline_options import PdfPipelineOptions"),
+    ("model_registry", "import model_registry"),
+    ("Simonhomework", "import Simonhomework"),
+]
+
+SNIPPET = """
+import time
+started = time.perf_counter()
+{statement}
+print(time.perf_counter() - started)
+"""
+
+
+def time_import(statement, repeats):
+    """Median wall time of ``statement`` in fresh interpreters, or the error text."""
+    timings = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-c", SNIPPET.format(statement=statement)],
+            capture_output=True, text=True, cwd=Path(__file__).parent,
+        )
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+        timings.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings), None
+
+
+def importtime_breakdown(module, top):
+    """Print the slowest modules (cumulative microseconds) from ``python -X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=Path(__file__).parent,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time:   self_us | cumulative_us | module"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    print(f"{'cumulative s':>13} {'self s':>8}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1e6:>13.3f} {self_us / 1e6:>8.3f}  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time imports of the apps and their heavy dependencies.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--report", help="Optional JSON output path")
+    parser.add_argument("--importtime", metavar="MODULE", help="Show a -X importtime breakdown for MODULE")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        importtime_breakdown(args.importtime, args.top)
+        return
+
+    results = []
+    print(f"{'import':<30} {'median s':>9}")
+    for label, statement in TARGETS:
+        seconds, error = time_import(statement, args.repeats)
+        results.append({"module": label, "median_seconds": seconds, "error": error})
+        shown = f"{seconds:9.3f}" if seconds is not None else f"  failed: {error}"
+        print(f"{label:<30} {shown}")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps({
+            "python": sys.version.split()[0],
+            "repeats": args.repeats,
+            "results": results,
+        }, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
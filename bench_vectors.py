@@ -0,0 +1,170 @@
+"""Compare memory and recall of the vector store modes.
+
+Each backend ingests the same vectors in a fresh interpreter, so the
+reported RSS growth is its own: "chroma" is the current path (float32 lists
+into Chroma's HNSW index), "float16" and "int8" are the compact NumPy store
+with float32 rescoring. Recall@k is measured against exact float32 search.
+
+Vectors come from ``--corpus`` (chunked and embedded like the app does) or
+from synthetic clustered unit vectors.
+
+Examples:
+    python bench_vectors.py --vectors 200000
+    python bench_vectors.py --corpus docs/ --k 3,10 --report vectors.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def rss_mb():
+    import os
+
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def synthetic_vectors(count, dim, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def corpus_vectors(corpus):
+    import Simonhomework
+    import embedding_pool
+
+    chunks = []
+    for path in sorted(Path(corpus).rglob("*")):
+        if path.suffix.lower() in (".txt", ".md"):
+            chunks.extend(Simonhomework.split_text(path.read_text(encoding="utf-8", errors="ignore")))
+    return np.asarray(embedding_pool.encode(chunks), dtype=np.float32)
+
+
+def exact_neighbours(vectors, queries, k):
+    distances = (queries ** 2).sum(1)[:, None] + (vectors ** 2).sum(1)[None, :] - 2 * queries @ vectors.T
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def run_backend(backend, data_path, query_path, k, batch):
+    """Child process: ingest, query, and print one JSON result line."""
+    vectors = np.load(data_path)
+    queries = np.load(query_path)
+    ids = [str(i) for i in range(len(vectors))]
+    baseline = rss_mb()
+
+    started = time.perf_counter()
+    if backend == "chroma":
+        import chromadb
+        collection = chromadb.Client().create_collection(name="bench_vectors")
+        for start in range(0, len(vectors), batch):
+            # Same shape of call as add_text_to_chromadb: float32 lists
+            collection.add(ids=ids[start:start + batch],
+                           embeddings=vectors[start:start + batch].tolist())
+    else:
+        import vector_store
+        collection = vector_store.CompactCollection("bench_vectors", backend)
+        for start in range(0, len(vectors), batch):
+            collection.add(ids=ids[start:start + batch], embeddings=vectors[start:start + batch])
+    insert_seconds = time.perf_counter() - started
+    rss_growth = rss_mb() - baseline
+
+    latencies = []
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=["distances"])
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append([int(i) for i in result["ids"][0]])
+
+    row = {"backend": backend, "insert_seconds": round(insert_seconds, 2),
+           "rss_growth_mb": round(rss_growth, 1), "query_p50_ms": round(statistics.median(latencies), 2),
+           "found": found}
+    if backend != "chroma":
+        row["vector_bytes"] = collection.memory_bytes()
+        collection.close()
+    print(json.dumps(row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory and recall of chroma vs. compact vector storage.")
+    parser.add_argument("--backends", default="chroma,float16,int8")
+    parser.add_argument("--vectors", type=int, default=50000, help="Synthetic vector count")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--corpus", help="Directory of .txt/.md files to embed instead of synthetic data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", default="3,10")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--report", help="Optional JSON output path")
+    parser.add_argument("--backend-child", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    parser.add_argument("--query-data", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    top_ks = [int(k) for k in args.k.split(",")]
+    if args.backend_child:
+        run_backend(args.backend_child, args.data, args.query_data, max(top_ks), args.batch)
+        return
+
+    vectors = corpus_vectors(args.corpus) if args.corpus else synthetic_vectors(args.vectors, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    truth = exact_neighbours(vectors, queries, max(top_ks))
+    float32_mb = vectors.nbytes / 2**20
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_vectors_"))
+    np.save(workdir / "vectors.npy", vectors)
+    np.save(workdir / "queries.npy", queries)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims ({float32_mb:.1f} MB as float32), "
+          f"{len(queries)} queries")
+    header = f"{'backend':<8} {'rss MB':>8} {'vec MB':>7} {'B/vec':>6} {'insert s':>8} {'p50 ms':>7}"
+    print(header + "".join(f" {'recall@' + str(k):>9}" for k in top_ks))
+
+    results = []
+    for backend in args.backends.split(","):
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--backend-child", backend,
+             "--data", str(workdir / "vectors.npy"), "--query-data", str(workdir / "queries.npy"),
+             "--k", args.k, "--batch", str(args.batch)],
+            capture_output=True, text=True, cwd=Path(__file__).resolve().parent,
+        )
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+            print(f"{backend:<8} failed: {error}")
+            results.append({"backend": backend, "error": error})
+            continue
+
+        row = json.loads(proc.stdout.strip().splitlines()[-1])
+        found = row.pop("found")
+        row["recall"] = {
+            k: round(float(np.mean([len(set(f[:k]) & set(t[:k].tolist())) / k for f, t in zip(found, truth)])), 4)
+            for k in top_ks
+        }
+        results.append(row)
+
+        vector_bytes = row.get("vector_bytes", {})
+        vec_mb = f"{vector_bytes['used'] / 2**20:7.1f}" if vector_bytes else f"{float32_mb:7.1f}"
+        per_vector = vector_bytes.get("bytes_per_vector") or vectors.shape[1] * 4
+        print(f"{backend:<8} {row['rss_growth_mb']:>8.1f} {vec_mb} {per_vector:>6.0f} "
+              f"{row['insert_seconds']:>8.2f} {row['query_p50_ms']:>7.2f}"
+              + "".join(f" {row['recall'][k]:>9.3f}" for k in top_ks))
+
+    if args.report:
+        Path(args.report).write_text(json.dumps({
+            "vectors": len(vectors), "dim": int(vectors.shape[1]), "queries": len(queries),
+            "results": results,
+        }, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
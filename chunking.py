@@ -0,0 +1,239 @@
+"""Structure-aware Markdown chunker sized in embedding-model tokens.
+
+Docling's ``export_to_markdown`` produces headings, pipe tables and lists.
+Character-based splitting cuts straight through them and ignores the
+embedding model's window (256 word pieces for all-MiniLM-L6-v2), so long
+chunks are silently truncated when embedded. This chunker:
+
+- never splits inside a table row, list item or code block,
+- starts a new chunk at every heading and prefixes chunks with their heading path,
+- splits oversized tables by rows (repeating the header), lists by items and
+  paragraphs by sentences, and any single unit still over the window by words,
+- measures everything with the embedding model's tokenizer,
+- consumes its input line by line and yields chunks as it goes.
+"""
+import io
+import re
+
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(€$£])")
+
+
+def _lines(source):
+    """Iterate lines of a string or any iterable of lines, without the newline."""
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    for line in source:
+        yield line.rstrip("\n").rstrip("\r")
+
+
+def iter_blocks(source):
+    """Group Markdown lines into blocks, yielding (kind, lines).
+
+    Kinds: "heading", "table", "list", "code", "paragraph".
+    """
+    kind = None
+    block = []
+
+    for line in _lines(source):
+        stripped = line.strip()
+
+        if kind == "code":
+            block.append(line)
+            if stripped.startswith("```"):
+                yield kind, block
+                kind, block = None, []
+            continue
+
+        if stripped.startswith("```"):
+            if block:
+                yield kind, block
+            kind, block = "code", [line]
+            continue
+
+        if HEADING.match(stripped):
+            if block:
+                yield kind, block
+            yield "heading", [stripped]
+            kind, block = None, []
+            continue
+
+        if not stripped:
+            if block:
+                yield kind, block
+            kind, block = None, []
+            continue
+
+        if stripped.startswith("|"):
+            line_kind = "table"
+        elif LIST_ITEM.match(line) or (kind == "list" and line[:1].isspace()):
+            line_kind = "list"
+        else:
+            line_kind = "paragraph"
+
+        if kind is not None and line_kind != kind:
+            yield kind, block
+            block = []
+        kind = line_kind
+        block.append(line)
+
+    if block:
+        yield kind, block
+
+
+def _split_table(lines, count_tokens, max_tokens):
+    """Split a table by rows, repeating the header and separator rows in each piece."""
+    header = lines[:2] if len(lines) > 1 and set(lines[1].strip()) <= set("|-: ") else lines[:1]
+    header_tokens = count_tokens("\n".join(header))
+    piece, piece_tokens = [], header_tokens
+    for row in lines[len(header):]:
+        row_tokens = count_tokens(row)
+        if piece and piece_tokens + row_tokens > max_tokens:
+            yield "\n".join(header + piece)
+            piece, piece_tokens = [], header_tokens
+        piece.append(row)
+        piece_tokens += row_tokens
+    if piece or not lines[len(header):]:
+        yield "\n".join(header + piece)
+
+
+def _split_units(units, count_tokens, max_tokens, overlap_tokens, joiner):
+    """Greedily pack units (list items, sentences, words) into pieces of at most max_tokens."""
+    piece, piece_tokens = [], 0
+    for unit in units:
+        unit_tokens = count_tokens(unit)
+        if piece and piece_tokens + unit_tokens > max_tokens:
+            yield joiner.join(piece)
+            # Carry the last unit over when it is small enough to act as overlap
+            last = piece[-1]
+            last_tokens = count_tokens(last)
+            if overlap_tokens and last_tokens <= overlap_tokens and last_tokens + unit_tokens <= max_tokens:
+                piece, piece_tokens = [last], last_tokens
+            else:
+                piece, piece_tokens = [], 0
+        piece.append(unit)
+        piece_tokens += unit_tokens
+    if piece:
+        yield joiner.join(piece)
+
+
+def _split_words(text, count_tokens, max_tokens, overlap_tokens):
+    """Last resort for a single unit longer than the window.
+
+    The step is estimated from the average tokens per word and shrunk until
+    each piece fits; only a single word longer than the window can exceed it.
+    """
+    words = text.split()
+    total = max(count_tokens(text), 1)
+    step = max(1, len(words) * max_tokens // total)
+    overlap = min(step // 2, max(0, len(words) * overlap_tokens // total))
+    start = 0
+    while start < len(words):
+        end = min(len(words), start + step)
+        while end - start > 1 and count_tokens(" ".join(words[start:end])) > max_tokens:
+            end = start + max(1, (end - start) * 3 // 4)
+        yield " ".join(words[start:end])
+        if end >= len(words):
+            break
+        start = max(start + 1, end - overlap)
+
+
+def _fit(pieces, count_tokens, max_tokens, overlap_tokens):
+    """Pass pieces through, word-splitting any that are still over the window."""
+    for piece in pieces:
+        if count_tokens(piece) > max_tokens:
+            yield from _split_words(piece, count_tokens, max_tokens, overlap_tokens)
+        else:
+            yield piece
+
+
+def _split_block(kind, lines, count_tokens, max_tokens, overlap_tokens):
+    """Split one oversized block along its natural boundaries.
+
+    A single table row, list item, code line or sentence that is itself over
+    the window falls back to word-level splitting.
+    """
+    if kind == "table":
+        pieces = _split_table(lines, count_tokens, max_tokens)
+    elif kind == "list":
+        items = []
+        for line in lines:
+            if LIST_ITEM.match(line) or not items:
+                items.append(line)
+            else:
+                items[-1] += "\n" + line
+        pieces = _split_units(items, count_tokens, max_tokens, 0, "\n")
+    elif kind == "code":
+        pieces = _split_units(lines, count_tokens, max_tokens, 0, "\n")
+    else:
+        text = " ".join(line.strip() for line in lines)
+        pieces = _split_units(SENTENCE_END.split(text), count_tokens, max_tokens, overlap_tokens, " ")
+    yield from _fit(pieces, count_tokens, max_tokens, overlap_tokens)
+
+
+def chunk_markdown(source, count_tokens, max_tokens=240, overlap_tokens=32):
+    """Yield chunk dicts {"text", "tokens", "section"} from Markdown text or lines.
+
+    ``count_tokens(text) -> int`` should use the embedding model's tokenizer.
+    The heading prefix is shortened (last heading only, then cut) or dropped
+    when it would leave less than a quarter of the window for content.
+    """
+    headings = []       # current heading path, e.g. ["Transfers", "2022"]
+    parts, part_tokens = [], 0
+    min_budget = max(16, max_tokens // 4)
+    prefix, prefix_tokens = "", 0
+
+    def section():
+        return " > ".join(headings)
+
+    def fitted_prefix():
+        limit = max_tokens - min_budget
+        for candidate in (section(), headings[-1] if headings else ""):
+            if count_tokens(candidate) <= limit:
+                return candidate
+        return next(_split_words(headings[-1], count_tokens, limit, 0), "") if limit > 0 else ""
+
+    def emit():
+        text = "\n\n".join(parts)
+        if prefix:
+            text = f"{prefix}\n\n{text}"
+        return {"text": text, "tokens": count_tokens(text), "section": section()}
+
+    for kind, lines in iter_blocks(source):
+        if kind == "heading":
+            if parts:
+                yield emit()
+                parts, part_tokens = [], 0
+            level_marks, title = HEADING.match(lines[0]).groups()
+            del headings[len(level_marks) - 1:]
+            headings.append(title.strip())
+            prefix = fitted_prefix()
+            prefix_tokens = count_tokens(prefix) if prefix else 0
+            continue
+
+        block = "\n".join(lines)
+        block_tokens = count_tokens(block)
+        # "\n\n" between prefix and body can cost a token with some tokenizers
+        budget = max(1, max_tokens - prefix_tokens - (1 if prefix else 0))
+
+        if part_tokens + block_tokens <= budget:
+            parts.append(block)
+            part_tokens += block_tokens
+            continue
+
+        if parts:
+            yield emit()
+            parts, part_tokens = [], 0
+
+        if block_tokens <= budget:
+            parts, part_tokens = [block], block_tokens
+        else:
+            for piece in _split_block(kind, lines, count_tokens, budget, overlap_tokens):
+                parts = [piece]
+                yield emit()
+            parts, part_tokens = [], 0
+
+    if parts:
+        yield emit()
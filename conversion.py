@@ -0,0 +1,237 @@
+"""Upload-to-Markdown conversion shared by the apps.
+
+Uploads arrive as bytes. Text files are decoded in memory, and PDFs and
+.docx files are handed to docling as a ``DocumentStream`` over the bytes, so
+neither touches disk. Anything else (legacy .doc, or a docling without
+stream support) is written to a managed scratch file that is deleted as soon
+as the conversion finishes (see scratch.py).
+
+PDFs get a quick PyPDF2 pre-scan first. Each page is classified by its text
+layer as "text" (plain prose), "tables" (tabular lines) or "ocr" (little or no
+text, i.e. scanned), and consecutive pages with the same class are converted
+as one page range with the cheapest docling pipeline that handles them. A
+born-digital report skips table and OCR models it doesn't need; a scanned one
+is OCRed instead of coming back empty. A lone "ocr" page between text pages
+(usually a blank or image-only separator or cover) follows its neighbours, and
+short runs are merged into a neighbour, so a mostly born-digital document is
+not OCRed end to end just because it is fragmented.
+
+Simple .docx and .pptx files skip docling entirely: fast_extract.py reads
+them with python-docx / python-pptx and only hands documents with complex
+layout on to docling.
+
+Converters come from the model registry (one per pipeline profile), so every
+app shares the same loaded docling pipelines.
+"""
+import inspect
+import os
+import re
+from io import BytesIO
+from pathlib import Path
+
+import fast_extract
+import model_registry
+import scratch
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".doc", ".docx", ".pptx", ".txt")
+# Formats docling can read from a byte stream
+STREAM_EXTENSIONS = (".pdf", ".docx", ".pptx")
+
+# Pre-scan: pages with fewer text-layer characters are treated as scanned
+MIN_TEXT_CHARS = int(os.environ.get("PDF_MIN_TEXT_CHARS", "32"))
+# ...and pages with at least this many table-like lines get table structure
+MIN_TABLE_LINES = 3
+# More ranges than this cost more in per-call overhead than they save
+MAX_PAGE_RANGES = 8
+# "ocr" runs up to this long between other pages are taken as blank or cover pages
+MAX_STRAY_OCR_PAGES = 1
+
+_CELL_GAP = re.compile(r"\t| {2,}")
+_NUMBER = re.compile(r"^[-+(]?[$€£]?\d[\d,.]*%?\)?$")
+
+
+def _looks_tabular(line):
+    """Three or more cells split by wide gaps, or three or more numeric tokens."""
+    cells = [c for c in _CELL_GAP.split(line.strip()) if c]
+    numbers = sum(1 for token in line.split() if _NUMBER.match(token))
+    return len(cells) >= 3 or numbers >= 3
+
+
+def classify_page(text):
+    """Cheapest pipeline profile for a page with this text layer."""
+    text = text or ""
+    if len(text.strip()) < MIN_TEXT_CHARS:
+        return "ocr"
+    if sum(1 for line in text.splitlines() if _looks_tabular(line)) >= MIN_TABLE_LINES:
+        return "tables"
+    return "text"
+
+
+def scan_pdf(source):
+    """Per-page profiles from the PDF's text layer (``source`` is a path or bytes); None if unreadable."""
+    try:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source))
+        profiles = []
+        for page in reader.pages:
+            try:
+                profiles.append(classify_page(page.extract_text()))
+            except Exception:
+                profiles.append("ocr")
+        return profiles
+    except Exception:
+        return None
+
+
+def _capable(*profiles):
+    return max(profiles, key=model_registry.PDF_PROFILES.index)
+
+
+def _runs(profiles):
+    """[[profile, first page, last page]] for consecutive pages with the same profile."""
+    ranges = []
+    for page, profile in enumerate(profiles, start=1):
+        if ranges and ranges[-1][0] == profile:
+            ranges[-1][2] = page
+        else:
+            ranges.append([profile, page, page])
+    return ranges
+
+
+def _rejoin(ranges):
+    """Runs again after profiles changed, so neighbours with the same profile become one."""
+    return _runs([profile for profile, first, last in ranges for _ in range(first, last + 1)])
+
+
+def _merge_runs(ranges):
+    """Merge the shortest run into a neighbour until at most MAX_PAGE_RANGES remain.
+
+    The merged run gets the more capable of the two profiles, so no page loses
+    a model it needed; the neighbour that keeps the cheaper profile wins.
+    """
+    while len(ranges) > MAX_PAGE_RANGES:
+        i = min(range(len(ranges)), key=lambda j: ranges[j][2] - ranges[j][1])
+        neighbours = [j for j in (i - 1, i + 1) if 0 <= j < len(ranges)]
+        j = min(neighbours, key=lambda n: (model_registry.PDF_PROFILES.index(_capable(ranges[i][0], ranges[n][0])),
+                                           ranges[n][2] - ranges[n][1]))
+        first, second = sorted((i, j))
+        ranges[first] = [_capable(ranges[first][0], ranges[second][0]), ranges[first][1], ranges[second][2]]
+        del ranges[second]
+        ranges = _rejoin(ranges)
+    return ranges
+
+
+def plan_pdf(profiles):
+    """[(profile, first page, last page)] runs, 1-based and inclusive.
+
+    Stray "ocr" pages take their neighbours' profile, and a plan still too
+    fragmented to be worth splitting has its shortest runs merged into a
+    neighbour. An unreadable scan, or a single run, becomes one range.
+    """
+    if not profiles:
+        return [(model_registry.DEFAULT_PDF_PROFILE, None, None)]
+    ranges = _runs(profiles)
+    if len(ranges) > 1:
+        for i, (profile, first, last) in enumerate(ranges):
+            if profile == "ocr" and last - first + 1 <= MAX_STRAY_OCR_PAGES:
+                neighbours = [ranges[j][0] for j in (i - 1, i + 1)
+                              if 0 <= j < len(ranges) and ranges[j][0] != "ocr"]
+                if neighbours:
+                    ranges[i][0] = _capable(*neighbours)
+        ranges = _merge_runs(_rejoin(ranges))
+    if len(ranges) == 1:
+        return [(ranges[0][0], None, None)]
+    return [tuple(r) for r in ranges]
+
+
+def _supports_page_range(converter):
+    """Whether this docling's ``convert`` accepts ``page_range``."""
+    try:
+        return "page_range" in inspect.signature(converter.convert).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _export(result):
+    return result.document.export_to_markdown(image_mode="placeholder")
+
+
+def convert_pdf(make_source, scan_source):
+    """Convert a PDF range by range; ``make_source()`` returns a fresh path or stream per call."""
+    plan = plan_pdf(scan_pdf(scan_source))
+    if len(plan) == 1:
+        # Docling is loaded on the first conversion (or by the startup warm-up)
+        return _export(model_registry.get_pdf_converter(plan[0][0]).convert(make_source()))
+
+    if not _supports_page_range(model_registry.get_pdf_converter(plan[0][0])):
+        # docling without page_range: one pass with the most capable profile needed
+        profile = _capable(*(p for p, _, _ in plan))
+        return _export(model_registry.get_pdf_converter(profile).convert(make_source()))
+
+    parts = []
+    for profile, first, last in plan:
+        result = model_registry.get_pdf_converter(profile).convert(make_source(), page_range=(first, last))
+        parts.append(_export(result))
+    return "\n\n".join(part for part in parts if part.strip())
+
+
+def decode_text(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1", errors="replace")
+
+
+def convert_file(file_path: str) -> str:
+    """Convert a file on disk to Markdown."""
+    path = Path(file_path)
+    ext = path.suffix.lower()
+
+    if ext == ".txt":
+        return decode_text(path.read_bytes())
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported extension: {ext}")
+
+    if ext == ".pdf":
+        return convert_pdf(lambda: str(path), path)
+    markdown = fast_extract.extract(path.name, path)
+    if markdown is not None:
+        return markdown
+    return _export(model_registry.get_default_converter().convert(str(path)))
+
+
+def convert_bytes(name: str, data: bytes) -> str:
+    """Convert an upload's bytes to Markdown, in memory when the format allows."""
+    ext = Path(name).suffix.lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported extension: {ext}")
+
+    if ext == ".txt":
+        scratch.get_scratch().record_in_memory()
+        return decode_text(data)
+
+    markdown = fast_extract.extract(name, data)
+    if markdown is not None:
+        scratch.get_scratch().record_in_memory()
+        return markdown
+
+    if ext in STREAM_EXTENSIONS:
+        try:
+            from docling.datamodel.base_models import DocumentStream
+        except ImportError:
+            DocumentStream = None
+        if DocumentStream is not None:
+            scratch.get_scratch().record_in_memory()
+            make_stream = lambda: DocumentStream(name=Path(name).name, stream=BytesIO(data))
+            if ext == ".pdf":
+                return convert_pdf(make_stream, data)
+            return _export(model_registry.get_default_converter().convert(make_stream()))
+
+    with scratch.get_scratch().file(name, data) as path:
+        return convert_file(path)
+
+
+def convert_upload(uploaded_file) -> str:
+    """Convert a Streamlit UploadedFile."""
+    return convert_bytes(uploaded_file.name, uploaded_file.getvalue())
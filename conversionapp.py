@@ -1,63 +1,129 @@
 import streamlit as st
 from pathlib import Path
-import tempfile
+import io
+import os
+import shutil
+import zipfile
 
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.backend.docling_parse_v2_backend import DoclingParseV2DocumentBackend
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
+import conversion
+import scratch
 
 
+# Convert a file on disk to markdown text (uploads go through conversion.convert_bytes)
 def convert_to_markdown(file_path: str) -> str:
-    path = Path(file_path)
-    ext = path.suffix.lower()
-
-    if ext == ".pdf":
-        pdf_opts = PdfPipelineOptions(do_ocr=False)
-        pdf_opts.accelerator_options = AcceleratorOptions(
-            num_threads=4,
-            device=AcceleratorDevice.CPU
-        )
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_options=pdf_opts,
-                    backend=DoclingParseV2DocumentBackend
-                )
-            }
-        )
-        doc = converter.convert(file_path).document
-        return doc.export_to_markdown(image_mode="placeholder")
+    return conversion.convert_file(file_path)
 
-    if ext in [".doc", ".docx"]:
-        converter = DocumentConverter()
-        doc = converter.convert(file_path).document
-        return doc.export_to_markdown(image_mode="placeholder")
 
-    if ext == ".txt":
-        try:
-            return path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            return path.read_text(encoding="latin-1", errors="replace")
+ARCHIVE_NAME = "converted_markdown.zip"
+PAGE_SIZE = 20
+
+
+class _Drain(io.RawIOBase):
+    """Write-only, unseekable sink whose bytes are handed on as soon as they are written."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
 
-    raise ValueError(f"Unsupported extension: {ext}")
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        parts, self._parts = self._parts, []
+        return parts
+
+
+def archive_chunks(files):
+    """The ZIP of ``files`` ([(path, name in archive)]) as a stream of byte chunks."""
+    sink = _Drain()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, name in files:
+            with open(path, "rb") as src, zf.open(name, "w") as dst:
+                shutil.copyfileobj(src, dst)
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def unique_name(stem, taken):
+    """``stem``.md, or ``stem`` (2).md and so on when an earlier upload already used it."""
+    name, n = f"{stem}.md", 1
+    while name in taken:
+        n += 1
+        name = f"{stem} ({n}).md"
+    taken.add(name)
+    return name
+
+
+def discard_outputs():
+    """Delete this session's converted files from the scratch space."""
+    for path, _ in st.session_state.get("downloads", []):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    st.session_state.downloads = []
+
+
+def show_downloads(files):
+    """A button that builds the ZIP on request, plus a paged list of the individual files.
+
+    Files are opened only for the buttons actually rendered, so a rerun
+    sends at most one page of Markdown to the browser. The ZIP is streamed
+    into a scratch file only when asked for and deleted as soon as its
+    download button has been rendered, so later reruns don't carry it.
+    """
+    st.markdown("### Download Converted Files")
+    files = [(path, name) for path, name in files if Path(path).exists()]
+    if files and st.button(f"Prepare ZIP ({len(files)} files)", key="zip_archive"):
+        try:
+            archive = scratch.get_scratch().write(ARCHIVE_NAME, archive_chunks(files))
+        except scratch.ScratchQuotaExceeded as e:
+            st.warning(str(e))
+        else:
+            try:
+                with open(archive, "rb") as f:
+                    st.download_button(
+                        label=f"Download all ({len(files)} files, ZIP)",
+                        data=f,
+                        file_name=ARCHIVE_NAME,
+                        mime="application/zip",
+                        key="dl_archive"
+                    )
+            finally:
+                os.remove(archive)
+
+    with st.expander("Individual files"):
+        pages = max(1, -(-len(files) // PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+        start = (page - 1) * PAGE_SIZE
+        for idx, (path, name) in enumerate(files[start:start + PAGE_SIZE], start=start):
+            with open(path, "rb") as f:
+                st.download_button(
+                    label=f"Download {name}",
+                    data=f,
+                    file_name=name,
+                    mime="text/markdown",
+                    key=f"dl_{idx}"
+                )
+    if len(files) < len(st.session_state.downloads):
+        st.caption("Some converted files expired from the scratch space; convert them again to download them.")
 
 
 def main():
     st.title("Batch Document to Markdown")
 
     uploaded = st.file_uploader(
-        "Choose files (PDF, DOC, DOCX, TXT)",
-        type=["pdf", "doc", "docx", "txt"],
+        "Choose files (PDF, DOC, DOCX, PPTX, TXT)",
+        type=["pdf", "doc", "docx", "pptx", "txt"],
         accept_multiple_files=True
     )
 
-    dest = st.text_input(
-        "Destination folder",
-        value="output_markdown"
-    )
-
-    # prepare session state for downloads
+    # prepare session state for downloads: (scratch path, download name) pairs.
+    # Every session gets its own uniquely named scratch files, so users never
+    # overwrite or see each other's documents.
     if "downloads" not in st.session_state:
         st.session_state.downloads = []
 
@@ -66,31 +132,23 @@ def main():
             st.error("No files selected.")
             return
 
-        # reset downloads list
-        st.session_state.downloads = []
-
-        out_folder = Path(dest)
-        out_folder.mkdir(parents=True, exist_ok=True)
+        # drop the previous batch's files
+        discard_outputs()
 
         progress = st.progress(0)
         status = st.empty()
 
         total = len(uploaded)
+        taken = set()
 
         for idx, up in enumerate(uploaded, start=1):
             name = up.name
             status.text(f"Converting {name} ({idx}/{total})")
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(name).suffix) as tmp:
-                tmp.write(up.getvalue())
-                tmp_path = tmp.name
-
             try:
-                md = convert_to_markdown(tmp_path)
-                out_file = out_folder / f"{Path(name).stem}.md"
-                out_file.write_text(md, encoding="utf-8", errors="replace")
-
-                # store for download
-                st.session_state.downloads.append((out_file.name, md))
+                # In memory where docling allows, otherwise a managed scratch file
+                md = conversion.convert_upload(up)
+                path = scratch.get_scratch().write(f"{Path(name).stem}.md", [md])
+                st.session_state.downloads.append((path, unique_name(Path(name).stem, taken)))
 
             except Exception as e:
                 st.warning(f"Failed: {name}: {e}")
@@ -98,19 +156,11 @@ def main():
             progress.progress(idx / total)
 
         status.text("Conversion done.")
-        st.success(f"Saved markdown files to {out_folder.resolve()}")
+        st.success(f"Converted {len(st.session_state.downloads)} of {total} files")
 
     # show download buttons after conversion
     if st.session_state.downloads:
-        st.markdown("### Download Converted Files")
-        for name, md in st.session_state.downloads:
-            st.download_button(
-                label=f"Download {name}",
-                data=md,
-                file_name=name,
-                mime="text/markdown",
-                key=f"dl_{name}"
-            )
+        show_downloads(st.session_state.downloads)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+"""Ingest-time deduplication of chunks.
+
+Repeated boilerplate (headers, footers, disclaimers) and copied documents
+would otherwise be embedded and stored once per copy, and the copies crowd
+distinct passages out of the top results. Each collection gets a DedupIndex
+that catches:
+
+- exact duplicates: sha256 of the whitespace/case-normalised text
+- near duplicates: MinHash over word 5-gram shingles, bucketed with LSH and
+  confirmed when the estimated Jaccard similarity reaches the threshold
+
+Configuration (environment):
+
+    DEDUP_MODE        "skip" (default), "merge" (skip, and also count the copies
+                      and list their files on the kept chunk) or "off"
+    DEDUP_THRESHOLD   estimated Jaccard similarity for a near duplicate (default 0.8)
+
+In both skip and merge mode the kept chunk is flagged as also belonging to
+the duplicate's file, so scope filters on that file still find it.
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+
+MODE = os.environ.get("DEDUP_MODE", "skip").strip().lower()
+THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 32            # 32 bands x 4 rows: pairs above ~0.45 similarity become candidates
+_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+
+
+def normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+
+def minhash(text):
+    """MinHash signature of the text's word shingles, or None if it is too short to compare."""
+    words = normalize(text).split()
+    if len(words) < SHINGLE_WORDS * 2:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(left, right):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(left == right))
+
+
+class DedupIndex:
+    """Hashes and MinHash signatures of the chunks stored in one collection."""
+
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        self.exact = {}                   # content hash -> chunk id
+        self.signatures = {}              # chunk id -> MinHash signature
+        self.buckets = defaultdict(list)  # (band, band hash) -> chunk ids
+        self._lock = threading.Lock()
+
+    def _bands(self, signature):
+        rows = NUM_PERM // BANDS
+        for band in range(BANDS):
+            yield band, signature[band * rows:(band + 1) * rows].tobytes()
+
+    def find(self, text):
+        """Return ("exact" | "near", chunk_id) for a stored duplicate of ``text``, else (None, None)."""
+        match = self.exact.get(content_hash(text))
+        if match is not None:
+            return "exact", match
+
+        signature = minhash(text)
+        if signature is None:
+            return None, None
+        best, best_score = None, self.threshold
+        seen = set()
+        for key in self._bands(signature):
+            for chunk_id in self.buckets.get(key, ()):
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                score = similarity(signature, self.signatures[chunk_id])
+                if score >= best_score:
+                    best, best_score = chunk_id, score
+        return ("near", best) if best is not None else (None, None)
+
+    def add(self, chunk_id, text):
+        self.exact.setdefault(content_hash(text), chunk_id)
+        signature = minhash(text)
+        if signature is not None:
+            self.signatures[chunk_id] = signature
+            for key in self._bands(signature):
+                self.buckets[key].append(chunk_id)
+
+    def filter(self, chunk_ids, chunks):
+        """Split a batch into chunks to store and duplicates to drop.
+
+        Duplicates are detected against stored chunks and earlier chunks of
+        the same batch. Returns (keep, duplicates): keep is a list of batch
+        positions, duplicates a list of (position, kind, kept chunk id).
+        """
+        keep, duplicates = [], []
+        with self._lock:
+            for position, (chunk_id, text) in enumerate(zip(chunk_ids, chunks)):
+                kind, match = self.find(text)
+                if kind:
+                    duplicates.append((position, kind, match))
+                else:
+                    self.add(chunk_id, text)
+                    keep.append(position)
+        return keep, duplicates
+
+
+_indexes_lock = threading.Lock()
+_indexes = {}
+
+
+def get_index(collection_name):
+    """The process-wide dedup index for ``collection_name``."""
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = DedupIndex()
+        return _indexes[collection_name]
+
+
+def reset_index(collection_name):
+    """Forget the dedup index for a collection that was deleted or rebuilt."""
+    with _indexes_lock:
+        _indexes.pop(collection_name, None)
+
+
+def deduplicate(texts, threshold=THRESHOLD):
+    """Standalone pass over a list of texts. Returns (kept positions, stats)."""
+    keep, duplicates = DedupIndex(threshold).filter([str(i) for i in range(len(texts))], texts)
+    return keep, summarize(texts, duplicates)
+
+
+def summarize(texts, duplicates):
+    """Counts and bytes saved for the duplicates found in ``texts``."""
+    return {
+        "exact_duplicates": sum(1 for _, kind, _ in duplicates if kind == "exact"),
+        "near_duplicates": sum(1 for _, kind, _ in duplicates if kind == "near"),
+        "embeddings_saved": len(duplicates),
+        "bytes_saved": sum(len(texts[position].encode("utf-8")) for position, _, _ in duplicates),
+    }
@@ -0,0 +1,118 @@
+"""Per-document statistics computed once at ingest, with running aggregates.
+
+The document manager and the Insights Lab used to split every document's
+full text on each rerun. Here each document's numbers (words, chunks, bytes,
+pages, tokens) are computed once when it is added, and the totals, per-type
+counts and word-count range are updated incrementally on add and remove, so
+rendering costs O(number of documents) rather than O(corpus bytes).
+"""
+import bisect
+import io
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+
+def count_pages(path, data=None):
+    """Page count of a PDF (None for other files or unreadable PDFs).
+
+    Pass the file's bytes as ``data`` to read an upload without a file on disk;
+    ``path`` then only supplies the extension.
+    """
+    if Path(path).suffix.lower() != ".pdf":
+        return None
+    try:
+        from PyPDF2 import PdfReader
+        return len(PdfReader(io.BytesIO(data) if data is not None else str(path)).pages)
+    except Exception:
+        return None
+
+
+def document_stats(filename, content, size_bytes=None, pages=None, chunks=None, tokens=None, words=None):
+    """The stats record for one document. Splits the text at most once."""
+    return {
+        "filename": filename,
+        "extension": Path(filename).suffix.lower(),
+        "words": words if words is not None else len(content.split()),
+        "characters": len(content),
+        "bytes": size_bytes if size_bytes is not None else len(content.encode("utf-8")),
+        "pages": pages,
+        "chunks": chunks,
+        "tokens": tokens,
+    }
+
+
+class StatsStore:
+    """Stats for the documents of one workspace, keyed by document id."""
+
+    SUMMED = ("words", "bytes", "pages", "chunks", "tokens")
+
+    def __init__(self):
+        self.documents = {}           # doc id -> stats record
+        self.totals = Counter()
+        self.by_extension = Counter()
+        self._word_counts = []        # sorted, for the min/max range
+        self.uid = uuid.uuid4().hex   # with version, identifies this store's data for caches
+        self.version = 0              # bumped on every change; lets views cache on it
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, stats):
+        """Add (or replace) a document's stats and fold them into the aggregates."""
+        with self._lock:
+            if doc_id in self.documents:
+                self._remove(doc_id)
+            self.documents[doc_id] = stats
+            for key in self.SUMMED:
+                self.totals[key] += stats.get(key) or 0
+            self.by_extension[stats["extension"]] += 1
+            bisect.insort(self._word_counts, stats["words"])
+            self.version += 1
+
+    def update(self, doc_id, **fields):
+        """Fill in fields known only later (e.g. chunk count after ingest)."""
+        with self._lock:
+            stats = self.documents.get(doc_id)
+            if stats is None:
+                return
+            for key, value in fields.items():
+                if key in self.SUMMED:
+                    self.totals[key] += (value or 0) - (stats.get(key) or 0)
+                stats[key] = value
+            self.version += 1
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+            self.version += 1
+
+    def _remove(self, doc_id):
+        stats = self.documents.pop(doc_id, None)
+        if stats is None:
+            return
+        for key in self.SUMMED:
+            self.totals[key] -= stats.get(key) or 0
+        self.by_extension[stats["extension"]] -= 1
+        if not self.by_extension[stats["extension"]]:
+            del self.by_extension[stats["extension"]]
+        del self._word_counts[bisect.bisect_left(self._word_counts, stats["words"])]
+
+    def get(self, doc_id):
+        return self.documents.get(doc_id)
+
+    def summary(self):
+        """Totals and ranges for the overview metrics. O(1) apart from copying the type counts."""
+        with self._lock:
+            count = len(self.documents)
+            return {
+                "documents": count,
+                **{f"total_{key}": self.totals[key] for key in self.SUMMED},
+                "avg_words": self.totals["words"] // count if count else 0,
+                "min_words": self._word_counts[0] if count else 0,
+                "max_words": self._word_counts[-1] if count else 0,
+                "by_extension": dict(self.by_extension),
+                "version": self.version,
+            }
@@ -0,0 +1,373 @@
+"""Document packs: a corpus shipped as data instead of code.
+
+A pack is a directory (or a .zip of one) containing:
+
+    manifest.json     format version, document count, text fingerprint and,
+                      when embeddings are included, the embedder that made them
+    texts.jsonl       one {"id", "text", "metadata"} object per line
+    embeddings.npy    optional float32 matrix, one row per text, in file order
+
+The manifest identifies the embedding model itself (name, revision and
+dimension), not just the embedder spec, so embeddings made by a different
+model or version are rejected instead of being mixed with fresh ones.
+
+Embeddings are opened with ``np.load(mmap_mode="r")`` so loading a pack does
+not read the matrix into memory; rows are paged in when used. A .zip pack is
+extracted once into a cache directory (DOCPACK_CACHE) keyed by the archive's
+hash. A pack without matching embeddings can have them computed once into
+the same cache with ``cached_embeddings``; the pack itself is never modified
+at run time.
+
+Build packs offline:
+
+    python docpack.py build --source docs/ --output packs/my_pack
+    python docpack.py build --source corpus.jsonl --output packs/my_pack --embedder chroma-default --zip
+    python docpack.py embed packs/my_pack --embedder chroma-default
+    python docpack.py info packs/my_pack
+
+``--source`` is a directory of .txt/.md files (id = file stem) or a JSONL
+file in the texts.jsonl format. Embedders: "chroma-default" (Chroma's
+built-in all-MiniLM-L6-v2, what app.py's collection uses) or
+"sentence-transformers:<model name>".
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+TEXTS = "texts.jsonl"
+EMBEDDINGS = "embeddings.npy"
+# Extracted .zip packs and embeddings computed at run time (never written into a pack)
+CACHE_DIR = os.environ.get("DOCPACK_CACHE", str(Path(tempfile.gettempdir()) / "docpacks"))
+
+
+def text_fingerprint(ids, texts):
+    """sha256 over ids and texts in order; changes whenever any document does."""
+    digest = hashlib.sha256()
+    for doc_id, text in zip(ids, texts):
+        digest.update(doc_id.encode("utf-8") + b"\0" + text.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class DocPack:
+    """A loaded pack: ids, texts and metadata in memory, embeddings memory-mapped."""
+
+    def __init__(self, path, manifest, ids, texts, metadatas, embeddings):
+        self.path = path
+        self.manifest = manifest
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.embeddings = embeddings
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def fingerprint(self):
+        return self.manifest["text_fingerprint"]
+
+    @property
+    def embedder(self):
+        """The embedder spec the stored embeddings were made with, or None for a text-only pack."""
+        return (self.manifest.get("embedding") or {}).get("embedder")
+
+    def embeddings_for(self, embedder):
+        """The embedding matrix if it was made by the model ``embedder`` loads today, else None.
+
+        The stored model name, revision and dimension must all match; a pack
+        built before the model was upgraded is treated as text-only.
+        """
+        stored = self.manifest.get("embedding") or {}
+        if self.embeddings is None or stored.get("embedder") != embedder:
+            return None
+        current = model_fingerprint(embedder)
+        if any(stored.get(key) != current[key] for key in ("model", "revision")):
+            return None
+        if current.get("dim") is not None and stored.get("dim") != current["dim"]:
+            return None
+        if self.embeddings.ndim != 2 or self.embeddings.shape[1] != stored.get("dim"):
+            return None
+        return self.embeddings
+
+
+def _extract(archive, cache_dir=None):
+    """Extract a zipped pack once; later loads reuse the extracted copy."""
+    digest = hashlib.sha256()
+    with open(archive, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    target = cache_dir / f"{Path(archive).stem}-{digest.hexdigest()[:16]}"
+    if (target / MANIFEST).exists():
+        return target
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=cache_dir))
+    with zipfile.ZipFile(archive) as zf:
+        zf.extractall(staging)
+    # Archives may wrap the pack in a top-level folder
+    root = staging if (staging / MANIFEST).exists() else next(p.parent for p in staging.rglob(MANIFEST))
+    try:
+        os.replace(root, target)
+    except OSError:
+        # Another process extracted the same archive first
+        pass
+    shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def load(path, cache_dir=None):
+    """Load a pack directory or .zip archive."""
+    path = Path(path)
+    if path.suffix.lower() == ".zip":
+        path = _extract(path, cache_dir)
+
+    manifest = json.loads((path / MANIFEST).read_text(encoding="utf-8"))
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported document pack format: {manifest.get('format')!r}")
+
+    ids, texts, metadatas = [], [], []
+    with open(path / TEXTS, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                ids.append(record["id"])
+                texts.append(record["text"])
+                metadatas.append(record.get("metadata") or {})
+
+    embeddings = None
+    if manifest.get("embedding") and (path / EMBEDDINGS).exists():
+        import numpy as np
+        embeddings = np.load(path / EMBEDDINGS, mmap_mode="r")
+        if embeddings.shape[0] != len(ids):
+            raise ValueError(f"{path}: {embeddings.shape[0]} embeddings for {len(ids)} texts")
+
+    return DocPack(path, manifest, ids, texts, metadatas, embeddings)
+
+
+def model_fingerprint(spec):
+    """{"embedder", "model", "revision", "dim"} for an embedder spec, without loading the model.
+
+    "chroma-default" is pinned by the SHA-256 of the ONNX archive Chroma
+    downloads; sentence-transformers models by the Hugging Face commit of the
+    locally cached copy (None if it isn't cached yet). ``dim`` is None when
+    only loading the model would tell.
+    """
+    if spec == "chroma-default":
+        from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+        return {"embedder": spec, "model": ONNXMiniLM_L6_V2.MODEL_NAME,
+                "revision": ONNXMiniLM_L6_V2._MODEL_SHA256, "dim": 384}
+    if spec.startswith("sentence-transformers:"):
+        model = spec.split(":", 1)[1]
+        revision = None
+        try:
+            from huggingface_hub import snapshot_download
+            repo = model if "/" in model else f"sentence-transformers/{model}"
+            # The snapshot folder is named after the commit it was downloaded at
+            revision = Path(snapshot_download(repo, local_files_only=True)).name
+        except Exception:
+            pass
+        return {"embedder": spec, "model": model, "revision": revision, "dim": None}
+    raise ValueError(f"Unknown embedder: {spec!r}")
+
+
+def _embedder(spec):
+    """A texts -> float32 matrix function for an embedder spec."""
+    import numpy as np
+
+    if spec == "chroma-default":
+        from chromadb.utils import embedding_functions
+        embed = embedding_functions.DefaultEmbeddingFunction()
+        return lambda texts: np.asarray(embed(texts), dtype=np.float32)
+    if spec.startswith("sentence-transformers:"):
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(spec.split(":", 1)[1])
+        return lambda texts: model.encode(texts, batch_size=64, convert_to_numpy=True).astype(np.float32)
+    raise ValueError(f"Unknown embedder: {spec!r}")
+
+
+def read_source(source):
+    """Records from a directory of .txt/.md files or a texts.jsonl-style file."""
+    source = Path(source)
+    if source.is_dir():
+        for file in sorted(source.rglob("*")):
+            if file.suffix.lower() in (".txt", ".md"):
+                yield {"id": file.stem, "text": file.read_text(encoding="utf-8"),
+                       "metadata": {"filename": file.name}}
+        return
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build(records, output, name=None, embedder=None, batch_size=256):
+    """Write a pack directory from records; embeds the texts when ``embedder`` is given."""
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    records = list(records)
+    ids = [r["id"] for r in records]
+    texts = [r["text"] for r in records]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Document ids in a pack must be unique")
+
+    with open(output / TEXTS, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps({"id": record["id"], "text": record["text"],
+                                "metadata": record.get("metadata") or {}}, ensure_ascii=False) + "\n")
+
+    embedding = None
+    (output / EMBEDDINGS).unlink(missing_ok=True)
+    if embedder:
+        embedding = _write_embeddings(output, texts, embedder, batch_size)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "name": name or output.name,
+        "documents": len(records),
+        "text_fingerprint": text_fingerprint(ids, texts),
+        "embedding": embedding,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    _write_manifest(output, manifest)
+    return manifest
+
+
+def _replace(target, write):
+    """Write ``target`` through ``write(file)`` into a temp file beside it, then rename it into place.
+
+    Readers (and concurrent writers) only ever see a complete file.
+    """
+    target = Path(target)
+    fd, staging = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(staging, target)
+    except BaseException:
+        Path(staging).unlink(missing_ok=True)
+        raise
+
+
+def _write_manifest(path, manifest):
+    _replace(Path(path) / MANIFEST, lambda f: f.write((json.dumps(manifest, indent=2) + "\n").encode("utf-8")))
+
+
+def _encode(texts, embedder, batch_size=256):
+    """(float32 matrix, model fingerprint) for ``texts``; checks the model's dimension."""
+    import numpy as np
+
+    encode = _embedder(embedder)
+    matrix = np.vstack([encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+    fingerprint = model_fingerprint(embedder)
+    if fingerprint["dim"] is not None and matrix.shape[1] != fingerprint["dim"]:
+        raise ValueError(f"{embedder} produced {matrix.shape[1]}-dim embeddings, expected {fingerprint['dim']}")
+    return matrix, {**fingerprint, "dim": int(matrix.shape[1]), "dtype": "float32"}
+
+
+def _write_embeddings(output, texts, embedder, batch_size=256):
+    """Embed ``texts`` into <output>/embeddings.npy; returns the manifest's "embedding" entry."""
+    import numpy as np
+
+    matrix, embedding = _encode(texts, embedder, batch_size)
+    _replace(Path(output) / EMBEDDINGS, lambda f: np.save(f, matrix))
+    return embedding
+
+
+def embed(path, embedder, batch_size=256):
+    """Add (or replace) the embeddings of an existing pack directory; returns the new manifest.
+
+    Meant for building packs offline: apps should not write into a pack, see
+    ``cached_embeddings`` instead.
+    """
+    pack = load(path)
+    if pack.path != Path(path):
+        raise ValueError("Embed the pack directory, then zip it again")
+    manifest = dict(pack.manifest,
+                    embedding=_write_embeddings(pack.path, pack.texts, embedder, batch_size))
+    _write_manifest(pack.path, manifest)
+    return manifest
+
+
+def cached_embeddings(pack, embedder, cache_dir=None, batch_size=256):
+    """Embeddings for a pack that didn't ship matching ones, computed once and kept in DOCPACK_CACHE.
+
+    The cache file is keyed by the pack's text fingerprint and the model's
+    name and revision, so a changed corpus or model never reuses stale rows.
+    Returns None for a model whose revision can't be pinned.
+    """
+    import numpy as np
+
+    fingerprint = model_fingerprint(embedder)
+    if not fingerprint["revision"]:
+        return None
+    model = "".join(c if c.isalnum() or c in "-_." else "_" for c in fingerprint["model"])
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    target = cache_dir / f"{pack.fingerprint[:16]}-{model}-{fingerprint['revision'][:16]}.npy"
+    if target.exists():
+        matrix = np.load(target, mmap_mode="r")
+        if matrix.ndim == 2 and matrix.shape[0] == len(pack) and (
+                fingerprint["dim"] is None or matrix.shape[1] == fingerprint["dim"]):
+            return matrix
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    matrix, _ = _encode(pack.texts, embedder, batch_size)
+    _replace(target, lambda f: np.save(f, matrix))
+    return np.load(target, mmap_mode="r")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and inspect document packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="Build a pack from text files or JSONL")
+    build_cmd.add_argument("--source", required=True, help="Directory of .txt/.md files or a .jsonl file")
+    build_cmd.add_argument("--output", required=True, help="Pack directory to write")
+    build_cmd.add_argument("--name")
+    build_cmd.add_argument("--embedder", help="chroma-default or sentence-transformers:<model>; "
+                                              "omit for a text-only pack")
+    build_cmd.add_argument("--zip", action="store_true", help="Also write <output>.zip")
+
+    embed_cmd = commands.add_parser("embed", help="Add embeddings to an existing pack directory")
+    embed_cmd.add_argument("path")
+    embed_cmd.add_argument("--embedder", required=True, help="chroma-default or sentence-transformers:<model>")
+
+    info_cmd = commands.add_parser("info", help="Show a pack's manifest")
+    info_cmd.add_argument("path")
+
+    args = parser.parse_args(argv)
+    if args.command == "info":
+        pack = load(args.path)
+        print(json.dumps(pack.manifest, indent=2))
+        if pack.embeddings is not None:
+            print(f"embeddings: {pack.embeddings.shape} {pack.embeddings.dtype} (memory-mapped)")
+        return
+    if args.command == "embed":
+        manifest = embed(args.path, args.embedder)
+        print(f"Embedded {manifest['documents']} documents in {args.path} with "
+              f"{manifest['embedding']['model']} ({manifest['embedding']['dim']} dims)")
+        return
+
+    manifest = build(read_source(args.source), args.output, args.name, args.embedder)
+    print(f"Wrote {manifest['documents']} documents to {args.output}"
+          + (f" with {args.embedder} embeddings" if args.embedder else " (text only)"))
+    if args.zip:
+        # Stored, not deflated: embeddings don't compress and extraction stays fast
+        archive = Path(args.output).with_suffix(".zip")
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zf:
+            for file in sorted(Path(args.output).iterdir()):
+                zf.write(file, file.name)
+        print(f"Wrote {archive}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Multi-process embedding for large ingests.
+
+A single SentenceTransformer process stops scaling long before a 32-core
+machine is busy. This module keeps a pool of worker processes, each with its
+own copy of the embedding model and a capped number of torch threads, and
+dispatches chunks to it in shards. The pool is started once per process and
+reused for every ingest.
+
+Configuration (environment):
+
+    EMBED_WORKERS              worker processes; 0 or 1 = encode in-process (default 0)
+    EMBED_THREADS_PER_WORKER   torch/OpenMP threads per worker (default: available cores // workers)
+    EMBED_SHARD_SIZE           chunks sent to a worker at a time (default 256)
+    EMBED_POOL_MIN_CHUNKS      smaller ingests skip the pool, IPC isn't worth it (default 512)
+
+Keep workers x threads at or below the core count, otherwise torch's
+intra-op threads oversubscribe the CPU and throughput drops. "Cores" are the
+ones this container may use (affinity mask and cgroup quota), not the host's.
+
+The pool is an optimisation, not a dependency: if it can't start or breaks,
+ingests fall back to the in-process embedder. Its state is kept here rather
+than in the model registry, so a failed pool shows up as "degraded" in
+``status()`` without making the app not ready.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import model_registry
+
+
+ENCODE_BATCH_SIZE = 64
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def configured_workers():
+    return _env_int("EMBED_WORKERS", 0)
+
+
+def configured_threads(workers):
+    default = max(1, model_registry.available_cores() // max(workers, 1))
+    return max(1, _env_int("EMBED_THREADS_PER_WORKER", default))
+
+
+SHARD_SIZE = _env_int("EMBED_SHARD_SIZE", 256)
+POOL_MIN_CHUNKS = _env_int("EMBED_POOL_MIN_CHUNKS", 512)
+
+
+# Worker side - runs in the spawned processes
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    """Cap thread pools before torch is imported, then load the model once."""
+    global _worker_model
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(texts):
+    return _worker_model.encode(texts, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True)
+
+
+def _ping(_=None):
+    return os.getpid()
+
+
+class EmbeddingPool:
+    """A pool of encode workers sharing nothing but the model name."""
+
+    def __init__(self, workers, threads_per_worker=None, model_name=model_registry.EMBEDDING_MODEL,
+                 shard_size=SHARD_SIZE):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or configured_threads(workers)
+        self.model_name = model_name
+        self.shard_size = shard_size
+        # spawn: forking a process that already holds torch/OpenMP state can deadlock
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, self.threads_per_worker),
+        )
+
+    def warm(self):
+        """Start every worker and wait until each has loaded the model."""
+        list(self._executor.map(_ping, range(self.workers)))
+
+    def encode(self, texts):
+        """Embed ``texts`` in shards across the workers; rows keep the input order."""
+        import numpy as np
+
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        return np.vstack(list(self._executor.map(_encode_shard, shards)))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool_lock = threading.Lock()
+_pools = {}          # workers -> started EmbeddingPool
+_pool_errors = {}    # workers -> why the pool failed; those ingests stay in-process
+
+
+def get_pool(workers=None):
+    """The process-wide pool, started on first use (None when pooling is disabled).
+
+    Raises if the pool can't start; later calls for the same worker count
+    raise again without retrying (see ``encode``).
+    """
+    workers = configured_workers() if workers is None else workers
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if workers in _pool_errors:
+            raise RuntimeError(f"Embedding pool ({workers} workers) failed: {_pool_errors[workers]}")
+        if workers not in _pools:
+            pool = EmbeddingPool(workers)
+            try:
+                pool.warm()
+            except Exception as e:
+                pool.shutdown()
+                _pool_errors[workers] = f"{type(e).__name__}: {e}"
+                raise
+            _pools[workers] = pool
+        return _pools[workers]
+
+
+def _mark_failed(workers, error):
+    with _pool_lock:
+        _pool_errors[workers] = f"{type(error).__name__}: {error}"
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown()
+
+
+def status():
+    """{"workers", "state", "error"} for health reports; state is disabled, idle, ready or degraded."""
+    workers = configured_workers()
+    with _pool_lock:
+        if workers <= 1:
+            state = "disabled"
+        elif workers in _pool_errors:
+            state = "degraded"
+        else:
+            state = "ready" if workers in _pools else "idle"
+        return {"workers": workers, "state": state, "error": _pool_errors.get(workers)}
+
+
+def encode(texts, workers=None):
+    """Embed a list of chunks, using the worker pool for large inputs.
+
+    Small inputs (and EMBED_WORKERS <= 1) are encoded in-process with one
+    batched call on the shared embedder. So is everything after the pool
+    fails; ``status()`` reports it as degraded.
+    """
+    texts = list(texts)
+    workers = configured_workers() if workers is None else workers
+    if len(texts) >= POOL_MIN_CHUNKS and workers > 1:
+        try:
+            pool = get_pool(workers)
+            return pool.encode(texts)
+        except Exception as e:
+            _mark_failed(workers, e)
+    return model_registry.get_embedder().encode(texts, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True)
@@ -0,0 +1,166 @@
+"""Direct DOCX/PPTX to Markdown for simple documents, without docling.
+
+Most uploads are plain memos: headings, paragraphs, lists and maybe a plain
+table. python-docx and python-pptx read those straight from the XML in
+milliseconds, where docling builds a full layout pipeline. Each extractor
+first looks for layout it can't represent faithfully and returns None in that
+case, so the caller falls back to docling:
+
+    DOCX   images, text boxes, equations, embedded objects, multi-column
+           sections, merged or nested table cells, body-level content
+           controls (cover pages, tables of contents)
+    PPTX   charts, SmartArt, embedded objects (graphic frames that are not
+           tables)
+
+Set FAST_EXTRACT=0 to send everything through docling.
+"""
+import os
+from io import BytesIO
+from pathlib import Path
+
+
+ENABLED = os.environ.get("FAST_EXTRACT", "1").strip().lower() not in ("0", "false", "no")
+
+IMAGE_PLACEHOLDER = "<!-- image -->"
+
+_DOCX_COMPLEX = " | ".join([
+    ".//w:drawing", ".//w:pict", ".//w:object", ".//w:txbxContent", ".//m:oMath",
+    ".//w:gridSpan", ".//w:vMerge", ".//w:tbl//w:tbl", ".//w:sectPr/w:cols[@w:num > 1]",
+    "./w:sdt",
+])
+
+
+def _open(source):
+    return BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source)
+
+
+def _cell(text):
+    return " ".join(text.split()).replace("|", "\\|")
+
+
+def _table_markdown(rows):
+    """Markdown table from a list of rows of cell strings; the first row is the header."""
+    rows = [[_cell(c) for c in row] for row in rows if row]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+    lines += ["| " + " | ".join(row) + " |" for row in rows[1:]]
+    return "\n".join(lines)
+
+
+# DOCX
+def _docx_prefix(paragraph):
+    """Markdown prefix for a paragraph's heading or list style."""
+    style = paragraph.style.name if paragraph.style is not None else ""
+    if style == "Title":
+        return "# "
+    if style.startswith("Heading "):
+        level = style.split()[-1]
+        if level.isdigit():
+            return "#" * min(int(level) + 1, 6) + " "
+
+    ppr = paragraph._p.pPr
+    numbered = ppr is not None and ppr.numPr is not None
+    if style.startswith("List") or numbered:
+        level = 0
+        if numbered and ppr.numPr.ilvl is not None:
+            level = ppr.numPr.ilvl.val
+        marker = "1. " if "Number" in style else "- "
+        return "  " * level + marker
+    return ""
+
+
+def docx_to_markdown(source):
+    """Markdown for a simple .docx (path or bytes), or None if it needs docling."""
+    from docx import Document
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = Document(_open(source))
+    body = document.element.body
+    if body.xpath(_DOCX_COMPLEX):
+        return None
+
+    blocks = []
+    for element in body.iterchildren():
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            paragraph = Paragraph(element, document)
+            text = paragraph.text.strip()
+            if not text:
+                continue
+            prefix = _docx_prefix(paragraph)
+            # Consecutive list items stay in one block
+            if prefix.lstrip().startswith(("- ", "1. ")) and blocks and blocks[-1][0] == "list":
+                blocks[-1][1].append(prefix + text)
+            else:
+                kind = "list" if prefix.lstrip().startswith(("- ", "1. ")) else "text"
+                blocks.append((kind, [prefix + text]))
+        elif tag == "tbl":
+            table = Table(element, document)
+            blocks.append(("table", [_table_markdown([[cell.text for cell in row.cells] for row in table.rows])]))
+    return "\n\n".join("\n".join(lines) for _, lines in blocks if any(lines))
+
+
+# PPTX
+def _pptx_shapes(shapes):
+    """Shapes in reading order (top to bottom, left to right), with groups flattened."""
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    for shape in sorted(shapes, key=lambda s: (s.top or 0, s.left or 0)):
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _pptx_shapes(shape.shapes)
+        else:
+            yield shape
+
+
+def pptx_to_markdown(source):
+    """Markdown for a simple .pptx (path or bytes), one section per slide, or None if it needs docling."""
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+    from pptx.shapes.graphfrm import GraphicFrame
+
+    presentation = Presentation(_open(source))
+    sections = []
+    for number, slide in enumerate(presentation.slides, start=1):
+        title_shape = slide.shapes.title
+        title = title_shape.text_frame.text.strip() if title_shape is not None else ""
+        lines = [f"## Slide {number}" + (f": {title}" if title else "")]
+
+        for shape in _pptx_shapes(slide.shapes):
+            if title_shape is not None and shape.shape_id == title_shape.shape_id:
+                continue
+            if isinstance(shape, GraphicFrame):
+                if not shape.has_table:
+                    return None
+                lines.append(_table_markdown([[cell.text for cell in row.cells] for row in shape.table.rows]))
+            elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+                lines.append(IMAGE_PLACEHOLDER)
+            elif shape.has_text_frame:
+                bulleted = shape.is_placeholder
+                items = []
+                for paragraph in shape.text_frame.paragraphs:
+                    text = "".join(run.text for run in paragraph.runs).strip()
+                    if text:
+                        items.append(("  " * paragraph.level + "- " + text) if bulleted else text)
+                if items:
+                    lines.append("\n".join(items))
+        sections.append("\n\n".join(lines))
+    return "\n\n".join(sections)
+
+
+EXTRACTORS = {".docx": docx_to_markdown, ".pptx": pptx_to_markdown}
+
+
+def extract(name, source):
+    """Fast-path Markdown for ``name`` from a path or bytes, or None to use docling."""
+    extractor = EXTRACTORS.get(Path(name).suffix.lower())
+    if not ENABLED or extractor is None:
+        return None
+    try:
+        return extractor(source)
+    except Exception:
+        # Missing library or a file python-docx/pptx can't parse: let docling try
+        return None
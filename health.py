@@ -0,0 +1,167 @@
+"""Cheap liveness and readiness probes.
+
+Neither probe loads a model: they read the model registry's state, run
+``collection.count()`` against the live store (only if the store is already
+open) and report memory headroom. Both are meant to finish in a few
+milliseconds. Readiness also reports scratch-space usage and cleanup
+counters (see scratch.py) and the embedding pool's state; a degraded pool
+doesn't fail readiness, since ingests fall back to in-process encoding.
+
+Set HEALTH_PORT to also serve them over HTTP for an external orchestrator:
+
+    GET /livez   -> 200 while the process is serving
+    GET /readyz  -> 200 when ready, 503 otherwise (JSON body with details)
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import embedding_pool
+import model_registry
+import scratch
+
+
+PROCESS_STARTED = time.time()
+
+# Readiness fails when less memory than this is available to the process
+MIN_AVAILABLE_MB = int(os.environ.get("HEALTH_MIN_AVAILABLE_MB", "256"))
+
+# Components that must be loaded before the process reports ready, e.g. "chroma,embedder:all-MiniLM-L6-v2"
+REQUIRED_COMPONENTS = [c for c in os.environ.get("HEALTH_REQUIRED", "").split(",") if c.strip()]
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return None if value == "max" else int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def memory_headroom():
+    """Process RSS and available memory in MB, honouring a cgroup limit when set."""
+    info = {"rss_mb": None, "available_mb": None, "limit_mb": None}
+
+    try:
+        with open("/proc/self/statm") as f:
+            info["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        with open("/proc/meminfo") as f:
+            meminfo = dict(line.split(":", 1) for line in f)
+        info["available_mb"] = round(int(meminfo["MemAvailable"].split()[0]) / 1024, 1)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    # Containers: the cgroup limit is usually tighter than host memory
+    limit = _read_int("/sys/fs/cgroup/memory.max") or _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    usage = _read_int("/sys/fs/cgroup/memory.current") or _read_int("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+    if limit and usage is not None and limit < 2**60:
+        info["limit_mb"] = round(limit / 2**20, 1)
+        cgroup_available = round((limit - usage) / 2**20, 1)
+        if info["available_mb"] is None or cgroup_available < info["available_mb"]:
+            info["available_mb"] = cgroup_available
+
+    return info
+
+
+def liveness():
+    """The process is up and able to answer. Never touches models or the store."""
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - PROCESS_STARTED, 1),
+    }
+
+
+def readiness(collection=None, collection_name="documents"):
+    """Check registry state, the live store and memory headroom without loading anything."""
+    started = time.perf_counter()
+    issues = []
+
+    components = model_registry.status()
+    for name, component in components.items():
+        if component["status"] == model_registry.FAILED:
+            issues.append(f"{name} failed to load: {component['error']}")
+    for name in REQUIRED_COMPONENTS:
+        if components.get(name, {}).get("status") != model_registry.READY:
+            issues.append(f"{name} is not loaded yet")
+
+    store = {"status": "not_loaded", "count": None}
+    try:
+        if collection is None and model_registry.is_ready(model_registry.vector_store_key()):
+            collection = model_registry.get_vector_client().get_collection(name=collection_name)
+        if collection is not None:
+            store = {"status": "ok", "count": collection.count()}
+    except Exception as e:
+        message = str(e)
+        if "does not exist" in message.lower():
+            store = {"status": "empty", "count": 0}
+        else:
+            store = {"status": "error", "count": None}
+            issues.append(f"Database issue: {e}")
+
+    memory = memory_headroom()
+    if memory["available_mb"] is not None and memory["available_mb"] < MIN_AVAILABLE_MB:
+        issues.append(f"Low memory: {memory['available_mb']} MB available (< {MIN_AVAILABLE_MB} MB)")
+
+    return {
+        "status": "ready" if not issues else "not_ready",
+        "issues": issues,
+        "components": components,
+        "warmup": model_registry.warmup_status()["state"],
+        "store": store,
+        "memory": memory,
+        "scratch": scratch.metrics(),
+        "embedding_pool": embedding_pool.status(),
+        "checked_in_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path in ("/livez", "/healthz"):
+            body, code = liveness(), 200
+        elif self.path == "/readyz":
+            body = readiness()
+            code = 200 if body["status"] == "ready" else 503
+        else:
+            body, code = {"error": "not found"}, 404
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Probes hit this every few seconds; keep them out of the app logs
+        pass
+
+
+_server_lock = threading.Lock()
+_server = None
+
+
+def start_health_server(port=None, host="0.0.0.0"):
+    """Serve /livez and /readyz on ``port`` (default: HEALTH_PORT) once per process."""
+    global _server
+    port = port or os.environ.get("HEALTH_PORT")
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _HealthHandler)
+            except OSError:
+                # Another process (or an earlier import) already owns the port
+                return None
+            threading.Thread(target=_server.serve_forever, name="health-server", daemon=True).start()
+        return _server
@@ -0,0 +1,239 @@
+"""Append-only search history in SQLite.
+
+Every question asked in any session is appended to one table, indexed on
+timestamp, source and question hash, so the analytics can aggregate across
+all users with indexed queries instead of re-parsing formatted strings. Each
+session keeps only a small ring buffer (a ``deque`` with ``maxlen``) of its
+own recent searches for display.
+
+The database lives at HISTORY_DB (default ~/.streamlitai/search_history.db)
+and runs in WAL mode, so readers never block the writer. Connections are
+per thread because Streamlit serves each session from its own thread.
+
+Timestamps are epoch seconds (REAL); hours for the charts are computed in
+local time by SQLite.
+
+Exports (Markdown, JSONL, CSV) are produced by generators over
+``iter_searches`` and written to a file in the scratch directory (see
+scratch.py), so a history of any size is never held in memory as one
+string, and exports abandoned by closed sessions are swept by age.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import scratch
+
+
+DEFAULT_PATH = os.environ.get("HISTORY_DB", str(Path.home() / ".streamlitai" / "search_history.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    session_id TEXT,
+    workspace TEXT,
+    question TEXT NOT NULL,
+    question_hash TEXT NOT NULL,
+    answer TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS searches_ts ON searches (ts);
+CREATE INDEX IF NOT EXISTS searches_source ON searches (source, ts);
+CREATE INDEX IF NOT EXISTS searches_question_hash ON searches (question_hash);
+CREATE INDEX IF NOT EXISTS searches_session ON searches (session_id, id);
+"""
+
+COLUMNS = ("id", "ts", "session_id", "workspace", "question", "answer", "source")
+
+# format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "Markdown": ("md", "text/markdown"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "CSV": ("csv", "text/csv"),
+}
+EXPORT_FIELDS = ("timestamp", "question", "answer", "source", "workspace")
+
+
+def question_hash(question):
+    """Hash of the normalised question, so repeats of the same question can be grouped."""
+    return hashlib.sha1(" ".join(question.lower().split()).encode("utf-8")).hexdigest()
+
+
+def _range_clause(since=None, until=None, session_id=None):
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts <= ?")
+        params.append(until)
+    if session_id is not None:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class HistoryStore:
+    """SQLite-backed, append-only log of searches."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, question, answer, source, session_id=None, workspace=None, ts=None):
+        """Record one search and return its row id."""
+        ts = time.time() if ts is None else ts
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO searches (ts, session_id, workspace, question, question_hash, answer, source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ts, session_id, workspace, question, question_hash(question), answer, source),
+            )
+            return cursor.lastrowid
+
+    def version(self):
+        """Changes whenever a search is added; cheap enough to check on every rerun."""
+        row = self._connection().execute("SELECT MAX(id) FROM searches").fetchone()
+        return row[0] or 0
+
+    def count(self, since=None, until=None, session_id=None):
+        where, params = _range_clause(since, until, session_id)
+        return self._connection().execute(f"SELECT COUNT(*) FROM searches{where}", params).fetchone()[0]
+
+    def recent(self, session_id=None, limit=10):
+        """Newest searches first, optionally for one session."""
+        where, params = _range_clause(session_id=session_id)
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM searches{where} ORDER BY id DESC LIMIT ?", params + [limit]
+        )
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def iter_searches(self, since=None, until=None, session_id=None, batch_size=500):
+        """Yield searches oldest first in batches, without loading the whole table."""
+        where, params = _range_clause(since, until, session_id)
+        cursor = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM searches{where} ORDER BY ts, id", params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(COLUMNS, row))
+
+    def source_counts(self, since=None, until=None, limit=20):
+        """[(source, searches)] for the most referenced documents."""
+        where, params = _range_clause(since, until)
+        return self._connection().execute(
+            f"SELECT source, COUNT(*) AS n FROM searches{where} GROUP BY source ORDER BY n DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+
+    def hourly_counts(self, since=None, until=None):
+        """[(hour 0-23, searches)] in local time; hours without searches are omitted."""
+        where, params = _range_clause(since, until)
+        return self._connection().execute(
+            "SELECT CAST(strftime('%H', ts, 'unixepoch', 'localtime') AS INTEGER) AS hour, COUNT(*) "
+            f"FROM searches{where} GROUP BY hour ORDER BY hour",
+            params,
+        ).fetchall()
+
+    def top_questions(self, since=None, until=None, limit=10):
+        """[(question, times asked)] grouped by normalised question."""
+        where, params = _range_clause(since, until)
+        return self._connection().execute(
+            f"SELECT MIN(question), COUNT(*) AS n FROM searches{where} "
+            "GROUP BY question_hash ORDER BY n DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+
+
+# Export
+def _timestamp(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def export_chunks(searches, fmt="Markdown", title="Conversation History"):
+    """Yield the export of ``searches`` (an iterable of search dicts) piece by piece."""
+    if fmt == "Markdown":
+        yield f"# {title}\n\nGenerated: {_timestamp(time.time())}\n\n"
+        for i, search in enumerate(searches, 1):
+            yield (f"## Conversation {i} ({_timestamp(search['ts'])})\n\n"
+                   f"**Q:** {search['question']}\n\n"
+                   f"**A:** {search['answer']}\n\n"
+                   f"**Source:** {search['source']}\n\n"
+                   "---\n\n")
+    elif fmt == "JSONL":
+        for search in searches:
+            record = {field: search.get(field) for field in EXPORT_FIELDS}
+            record["timestamp"] = _timestamp(search["ts"])
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    elif fmt == "CSV":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for search in searches:
+            writer.writerow([_timestamp(search["ts"]), search["question"], search["answer"],
+                             search["source"], search.get("workspace")])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+
+
+def export_to_file(store, fmt="Markdown", since=None, until=None, session_id=None, **kwargs):
+    """Stream an export into a scratch file. Returns (path, number of searches).
+
+    The caller should delete the file when it is no longer offered for
+    download; if it never does (the session just ends), the scratch sweep
+    removes it after SCRATCH_MAX_AGE. Raises scratch.ScratchQuotaExceeded
+    when the scratch space is full.
+    """
+    extension = EXPORT_FORMATS[fmt][0]
+    count = 0
+
+    def searches():
+        nonlocal count
+        for search in store.iter_searches(since, until, session_id):
+            count += 1
+            yield search
+
+    # Through the scratch quota like every other scratch write
+    path = scratch.get_scratch().write(f"history.{extension}", export_chunks(searches(), fmt, **kwargs))
+    return path, count
+
+
+_store_lock = threading.Lock()
+_stores = {}
+
+
+def get_store(path=None):
+    """The process-wide store for ``path`` (default HISTORY_DB)."""
+    path = str(path or DEFAULT_PATH)
+    with _store_lock:
+        if path not in _stores:
+            _stores[path] = HistoryStore(path)
+        return _stores[path]
@@ -0,0 +1,362 @@
+"""Load-test harness for the question-answering path.
+
+Drives ``get_answer_with_source`` from Simonhomework.py (or ``get_answer`` from
+app.py) directly, without a browser, and writes a JSON report with latency
+percentiles, answers/sec and memory samples.
+
+Examples:
+    python loadtest.py --questions questions.txt --corpus docs/ --concurrency 4
+    python loadtest.py --target app --questions questions.txt --mode cold --cold-runs 3
+    python loadtest.py --questions questions.jsonl --corpus docs/ \\
+        --model google/flan-t5-small --report reports/flan-small.json
+
+Question files can be plain text (one question per line, ``#`` comments
+allowed), a JSON list of strings/objects, or JSONL objects with a
+``question`` field. The same ``--seed`` always replays the same order.
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+
+def load_questions(path):
+    """Read questions from a .txt, .json or .jsonl file."""
+    path = Path(path)
+    raw = path.read_text(encoding="utf-8")
+
+    if path.suffix == ".jsonl":
+        items = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    elif path.suffix == ".json":
+        items = json.loads(raw)
+    else:
+        items = [line.strip() for line in raw.splitlines()
+                 if line.strip() and not line.strip().startswith("#")]
+
+    questions = [item["question"] if isinstance(item, dict) else str(item) for item in items]
+    if not questions:
+        raise ValueError(f"No questions found in {path}")
+    return questions
+
+
+def build_schedule(questions, repeat, seed, limit=None):
+    """Expand the question set into a deterministic, replayable run order."""
+    schedule = list(questions) * repeat
+    if seed is not None:
+        random.Random(seed).shuffle(schedule)
+    if limit:
+        schedule = schedule[:limit]
+    return schedule
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is KB on Linux and bytes on macOS; it is a peak, not current
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class MemorySampler(threading.Thread):
+    """Background thread recording RSS every ``interval`` seconds."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+        self._start = time.perf_counter()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        elapsed = time.perf_counter() - self._start
+        self.samples.append({"t": round(elapsed, 3), "rss_mb": round(current_rss_mb(), 1)})
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+# Targets: each returns (answer_fn, setup_info) where
+# answer_fn(question) -> (answer, source, per-stage ms or None)
+def prepare_simonhomework(args):
+    """Import Simonhomework.py and ingest the corpus into its collection."""
+    started = time.perf_counter()
+    module = importlib.import_module("Simonhomework")
+    import_seconds = time.perf_counter() - started
+
+    if args.model:
+        module.GENERATOR_MODEL = args.model
+    settings = json.loads(args.settings) if args.settings else None
+
+    started = time.perf_counter()
+    files = sorted(p for p in Path(args.corpus).rglob("*") if p.is_file())
+    collection = None
+    for file_path in files:
+        if file_path.suffix.lower() in TEXT_EXTENSIONS:
+            text = file_path.read_text(encoding="utf-8", errors="replace")
+        else:
+            text = module.convert_to_markdown(str(file_path))
+        collection = module.add_text_to_chromadb(text, file_path.name, args.collection)
+    if collection is None:
+        raise ValueError(f"No documents found under {args.corpus}")
+    ingest_seconds = time.perf_counter() - started
+
+    def answer(question):
+        stages = {}
+        answer_text, source = module.get_answer_with_source(collection, question,
+                                                            settings=settings, timings=stages)
+        return answer_text, source, stages
+
+    return answer, {"import_seconds": import_seconds, "ingest_seconds": ingest_seconds,
+                    "documents": len(files), "chunks": collection.count()}
+
+
+def prepare_app(args):
+    """Import app.py, whose module-level script seeds its own collection."""
+    if args.model:
+        raise SystemExit("--model is only supported for the simonhomework target")
+
+    started = time.perf_counter()
+    module = importlib.import_module("app")
+    import_seconds = time.perf_counter() - started
+
+    def answer(question):
+        return module.get_answer(module.collection, question), None, None
+
+    # app.py stores whole documents, minus the ones dedup skipped, so the
+    # source count comes from its pack and the stored count from the collection
+    import docpack
+    return answer, {"import_seconds": import_seconds, "ingest_seconds": None,
+                    "documents": len(docpack.load(module.PACK_PATH)), "chunks": module.collection.count()}
+
+
+TARGETS = {
+    "simonhomework": prepare_simonhomework,
+    "app": prepare_app,
+}
+
+
+def timed_answer(answer_fn, question):
+    """Answer one question and record latency and outcome."""
+    started = time.perf_counter()
+    try:
+        answer, source, stages = answer_fn(question)
+        error = None
+    except Exception as e:
+        answer, source, stages, error = None, None, None, f"{type(e).__name__}: {e}"
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {
+        "question": question,
+        "latency_ms": round(latency_ms, 2),
+        "ok": error is None,
+        "source": source,
+        "answer_chars": len(answer) if answer else 0,
+        "stages_ms": stages,
+        "error": error,
+    }
+
+
+def run_cold_child(args):
+    """Measure import + setup + first answer in this fresh process and print JSON."""
+    process_start = time.perf_counter()
+    answer_fn, setup = TARGETS[args.target](args)
+    first = timed_answer(answer_fn, load_questions(args.questions)[0])
+    print(json.dumps({
+        **setup,
+        "first_answer_ms": first["latency_ms"],
+        "first_answer_ok": first["ok"],
+        "time_to_first_answer_seconds": round(time.perf_counter() - process_start, 3),
+        "peak_rss_mb": round(current_rss_mb(), 1),
+    }))
+
+
+def measure_cold_starts(args):
+    """Run ``--cold-runs`` fresh child processes and collect their cold-start numbers."""
+    runs = []
+    for _ in range(args.cold_runs):
+        cmd = [sys.executable, __file__, "--cold-child",
+               "--target", args.target, "--questions", str(Path(args.questions).resolve()),
+               "--collection", args.collection]
+        if args.corpus:
+            cmd += ["--corpus", str(Path(args.corpus).resolve())]
+        if args.model:
+            cmd += ["--model", args.model]
+        if args.settings:
+            cmd += ["--settings", args.settings]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=Path(__file__).parent)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            runs.append({"error": proc.stderr.strip()[-2000:]})
+        else:
+            runs.append(json.loads(lines[-1]))
+    return runs
+
+
+def summarize(results, wall_seconds):
+    """Aggregate per-question results into latency and throughput figures."""
+    ok = sorted(r["latency_ms"] for r in results if r["ok"])
+
+    # Per-stage latencies (vector, bm25, generation, ...) when the target reports them
+    stage_values = {}
+    for r in results:
+        for stage, ms in (r["stages_ms"] or {}).items():
+            if stage.endswith("_ms"):
+                stage_values.setdefault(stage, []).append(ms)
+    stages = {stage: {"p50": percentile(sorted(v), 50), "p95": percentile(sorted(v), 95)}
+              for stage, v in stage_values.items()}
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r["ok"]),
+        "wall_seconds": round(wall_seconds, 3),
+        "answers_per_sec": round(len(ok) / wall_seconds, 3) if wall_seconds > 0 else None,
+        "latency_ms": {
+            "min": ok[0] if ok else None,
+            "p50": percentile(ok, 50),
+            "p95": percentile(ok, 95),
+            "p99": percentile(ok, 99),
+            "max": ok[-1] if ok else None,
+            "mean": round(sum(ok) / len(ok), 2) if ok else None,
+        },
+        "stages_ms": stages,
+    }
+
+
+def run(args):
+    questions = load_questions(args.questions)
+    schedule = build_schedule(questions, args.repeat, args.seed, args.limit)
+
+    cold_starts = measure_cold_starts(args) if args.mode == "cold" and args.cold_runs else []
+
+    sampler = MemorySampler(args.memory_interval)
+    sampler.start()
+
+    answer_fn, setup = TARGETS[args.target](args)
+
+    warmup = None
+    if args.mode == "warm":
+        # One untimed answer per worker so model loads and first-call costs are excluded
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            warmup = list(pool.map(lambda q: timed_answer(answer_fn, q),
+                                   questions[:1] * args.concurrency))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda q: timed_answer(answer_fn, q), schedule))
+    wall_seconds = time.perf_counter() - started
+
+    sampler.stop()
+
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "target": args.target,
+            "mode": args.mode,
+            "model": args.model,
+            "settings": json.loads(args.settings) if args.settings else None,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "questions_file": args.questions,
+            "corpus": args.corpus,
+            "unique_questions": len(questions),
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "setup": setup,
+        "cold_starts": cold_starts,
+        "warmup_ms": [w["latency_ms"] for w in warmup] if warmup else None,
+        "summary": summarize(results, wall_seconds),
+        "memory": {
+            "peak_rss_mb": max(s["rss_mb"] for s in sampler.samples),
+            "samples": sampler.samples,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the document Q&A path without a browser.")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="simonhomework")
+    parser.add_argument("--questions", required=True, help="Question set (.txt, .json or .jsonl)")
+    parser.add_argument("--corpus", help="Directory of documents to ingest (simonhomework target)")
+    parser.add_argument("--collection", default="documents")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the question set N times")
+    parser.add_argument("--limit", type=int, help="Stop after this many requests")
+    parser.add_argument("--seed", type=int, default=0, help="Shuffle seed (-1 keeps file order)")
+    parser.add_argument("--mode", choices=["warm", "cold"], default="warm")
+    parser.add_argument("--cold-runs", type=int, default=1,
+                        help="Fresh processes used to measure cold start (cold mode)")
+    parser.add_argument("--model", help="Override the generator model (simonhomework target)")
+    parser.add_argument("--settings", help='JSON overrides for RETRIEVAL_SETTINGS, e.g. \'{"rerank": true}\'')
+    parser.add_argument("--memory-interval", type=float, default=0.5, help="Seconds between RSS samples")
+    parser.add_argument("--report", default="loadtest_report.json", help="Where to write the JSON report")
+    parser.add_argument("--cold-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.seed is not None and args.seed < 0:
+        args.seed = None
+    if args.target == "simonhomework" and not args.corpus:
+        parser.error("--corpus is required for the simonhomework target")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, str(Path(__file__).parent))
+
+    if args.cold_child:
+        run_cold_child(args)
+        return
+
+    report = run(args)
+    Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    summary = report["summary"]
+    latency = summary["latency_ms"]
+    print(f"{summary['requests']} requests, {summary['errors']} errors, "
+          f"{summary['answers_per_sec']} answers/sec")
+    print(f"latency ms: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']}")
+    print(f"peak RSS: {report['memory']['peak_rss_mb']} MB")
+    print(f"report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Process-wide registry for the heavy models and clients used by the apps.
+
+Nothing heavy is imported at module import time. Each component is loaded on
+first use, exactly once per process, and its state ("not_loaded", "loading",
+"ready", "failed") can be inspected without triggering a load.
+"""
+import os
+import threading
+import time
+
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+GENERATOR_MODEL = "google/flan-t5-base"
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# "chroma" (float32 + HNSW), or "float16" / "int8" for the compact NumPy store
+VECTOR_STORE_MODE = os.environ.get("VECTOR_STORE_MODE", "chroma").strip().lower()
+
+# Docling PDF pipelines, cheapest first: "text" reads the text layer only,
+# "tables" adds table-structure recognition, "ocr" also OCRs scanned pages.
+# conversion.py picks one per page range; "tables" was the only pipeline before.
+PDF_PROFILES = ("text", "tables", "ocr")
+DEFAULT_PDF_PROFILE = "tables"
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+_registry_lock = threading.Lock()
+_entries = {}
+
+
+def _entry(name, loader=None):
+    """Return the registry entry for ``name``, creating it if needed."""
+    with _registry_lock:
+        entry = _entries.get(name)
+        if entry is None:
+            entry = {
+                "status": NOT_LOADED,
+                "object": None,
+                "loader": loader,
+                "error": None,
+                "load_seconds": None,
+                "loaded_at": None,
+                "lock": threading.Lock(),
+            }
+            _entries[name] = entry
+        elif loader is not None and entry["loader"] is None:
+            entry["loader"] = loader
+        return entry
+
+
+def declare(name, loader):
+    """Register a zero-argument loader for ``name`` without loading it."""
+    _entry(name, loader)
+
+
+def get(name, loader=None):
+    """Return the component for ``name``, loading it on first use."""
+    entry = _entry(name, loader)
+    if entry["status"] == READY:
+        return entry["object"]
+
+    with entry["lock"]:
+        if entry["status"] == READY:
+            return entry["object"]
+        if entry["loader"] is None:
+            raise KeyError(f"No loader registered for {name!r}")
+
+        entry["status"] = LOADING
+        started = time.perf_counter()
+        try:
+            obj = entry["loader"]()
+        except Exception as e:
+            entry["status"] = FAILED
+            entry["error"] = f"{type(e).__name__}: {e}"
+            raise
+        entry["object"] = obj
+        entry["load_seconds"] = time.perf_counter() - started
+        entry["loaded_at"] = time.time()
+        entry["error"] = None
+        entry["status"] = READY
+        return obj
+
+
+def is_ready(name):
+    """True if ``name`` is loaded. Never triggers a load."""
+    entry = _entries.get(name)
+    return entry is not None and entry["status"] == READY
+
+
+def status():
+    """Snapshot of every known component's state. Never triggers a load."""
+    with _registry_lock:
+        return {
+            name: {
+                "status": entry["status"],
+                "load_seconds": entry["load_seconds"],
+                "loaded_at": entry["loaded_at"],
+                "error": entry["error"],
+            }
+            for name, entry in _entries.items()
+        }
+
+
+def unload(name=None):
+    """Drop one component (or all of them) so the next use reloads it."""
+    with _registry_lock:
+        names = [name] if name else list(_entries)
+        for key in names:
+            entry = _entries.get(key)
+            if entry is not None:
+                entry["status"] = NOT_LOADED
+                entry["object"] = None
+                entry["error"] = None
+
+
+# Loaders - heavy imports live inside these so they run on first use only
+def _load_chroma_client():
+    import chromadb
+    return chromadb.Client()
+
+
+def _load_compact_client(mode):
+    import vector_store
+    return vector_store.CompactVectorClient(mode, os.environ.get("VECTOR_STORE_DIR"))
+
+
+def _load_embedder(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def _load_cross_encoder(model_name):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device="cpu")
+
+
+def _load_generator(model_name):
+    from transformers import pipeline
+    return pipeline("text2text-generation", model=model_name)
+
+
+def available_cores():
+    """CPUs this process may use: affinity mask, capped by a cgroup CPU quota when set."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cores = min(cores, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def pdf_threads():
+    """Docling threads per conversion: PDF_THREADS, or every available core."""
+    return int(os.environ.get("PDF_THREADS", "0")) or available_cores()
+
+
+def _load_pdf_converter(profile=DEFAULT_PDF_PROFILE):
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.backend.docling_parse_v2_backend import DoclingParseV2DocumentBackend
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
+
+    if profile not in PDF_PROFILES:
+        raise ValueError(f"Unknown PDF profile: {profile!r}")
+    pdf_opts = PdfPipelineOptions(
+        do_ocr=profile == "ocr",
+        do_table_structure=profile != "text"
+    )
+    pdf_opts.accelerator_options = AcceleratorOptions(
+        num_threads=pdf_threads(),
+        device=AcceleratorDevice.CPU
+    )
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pdf_opts,
+                backend=DoclingParseV2DocumentBackend
+            )
+        }
+    )
+
+
+def _load_default_converter():
+    from docling.document_converter import DocumentConverter
+    return DocumentConverter()
+
+
+def get_chroma_client():
+    """Shared in-memory ChromaDB client."""
+    return get("chroma", _load_chroma_client)
+
+
+def vector_store_key(mode=None):
+    """Registry name of the vector store client for ``mode`` (default: VECTOR_STORE_MODE)."""
+    mode = mode or VECTOR_STORE_MODE
+    return "chroma" if mode == "chroma" else f"vector_store:{mode}"
+
+
+def get_vector_client(mode=None):
+    """Client for the configured vector store: Chroma or the compact NumPy store."""
+    mode = mode or VECTOR_STORE_MODE
+    if mode == "chroma":
+        return get_chroma_client()
+    return get(vector_store_key(mode), lambda: _load_compact_client(mode))
+
+
+def get_embedder(model_name=EMBEDDING_MODEL):
+    """Shared SentenceTransformer used for chunk and query embeddings."""
+    return get(f"embedder:{model_name}", lambda: _load_embedder(model_name))
+
+
+def get_generator(model_name=GENERATOR_MODEL):
+    """Shared text2text-generation pipeline for ``model_name``."""
+    return get(f"generator:{model_name}", lambda: _load_generator(model_name))
+
+
+def get_cross_encoder(model_name=RERANKER_MODEL):
+    """Shared CPU cross-encoder used to rerank retrieved passages."""
+    return get(f"cross_encoder:{model_name}", lambda: _load_cross_encoder(model_name))
+
+
+def get_pdf_converter(profile=DEFAULT_PDF_PROFILE):
+    """Shared docling converter for PDFs with the pipeline for ``profile`` (see PDF_PROFILES)."""
+    name = "pdf_converter" if profile == DEFAULT_PDF_PROFILE else f"pdf_converter:{profile}"
+    return get(name, lambda: _load_pdf_converter(profile))
+
+
+def get_default_converter():
+    """Shared docling converter with default options (Word documents)."""
+    return get("default_converter", _load_default_converter)
+
+
+# Warm-up: preload components and push one dummy input through each so the
+# first real request doesn't pay for model loading or first-inference setup.
+_warmup_lock = threading.Lock()
+_warmup = {"state": "idle", "started_at": None, "finished_at": None, "components": {}}
+
+
+def warmup_enabled():
+    """Warm-up runs unless WARMUP_MODELS is set to 0/false/no."""
+    return os.environ.get("WARMUP_MODELS", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _warm_embedder():
+    get_embedder().encode(["warm-up"])
+
+
+def _warm_generator(model_name):
+    get_generator(model_name)("Answer briefly: warm-up?", max_length=8)
+
+
+def _warm_pdf_converter():
+    converter = get_pdf_converter()
+    from docling.datamodel.base_models import InputFormat
+
+    # Builds the PDF pipeline and loads its layout/table models without a document
+    if hasattr(converter, "initialize_pipeline"):
+        converter.initialize_pipeline(InputFormat.PDF)
+
+
+def _warm_cross_encoder():
+    get_cross_encoder().predict([("warm-up", "warm-up passage")])
+
+
+def _run_warmup(steps):
+    for name, step in steps:
+        component = _warmup["components"][name]
+        component["status"] = "running"
+        started = time.perf_counter()
+        try:
+            step()
+            component["status"] = "ready"
+        except Exception as e:
+            component["status"] = "failed"
+            component["error"] = f"{type(e).__name__}: {e}"
+        component["seconds"] = round(time.perf_counter() - started, 2)
+    _warmup["finished_at"] = time.time()
+    _warmup["state"] = "done"
+
+
+def start_warmup(generator_model=GENERATOR_MODEL, include_converter=True, include_reranker=False):
+    """Start the background warm-up once per process. Safe to call on every rerun."""
+    steps = [
+        ("chroma", get_vector_client),
+        ("embedder", _warm_embedder),
+        ("generator", lambda: _warm_generator(generator_model)),
+    ]
+    if include_reranker:
+        steps.append(("cross_encoder", _warm_cross_encoder))
+    if include_converter:
+        steps.append(("pdf_converter", _warm_pdf_converter))
+
+    with _warmup_lock:
+        if _warmup["state"] != "idle":
+            return False
+        _warmup["state"] = "running"
+        _warmup["started_at"] = time.time()
+        _warmup["components"] = {
+            name: {"status": "pending", "seconds": None, "error": None} for name, _ in steps
+        }
+
+    threading.Thread(target=_run_warmup, args=(steps,), name="model-warmup", daemon=True).start()
+    return True
+
+
+def warmup_status():
+    """Snapshot of the warm-up progress."""
+    with _warmup_lock:
+        return {
+            "state": _warmup["state"],
+            "started_at": _warmup["started_at"],
+            "finished_at": _warmup["finished_at"],
+            "components": {name: dict(c) for name, c in _warmup["components"].items()},
+        }
@@ -0,0 +1,349 @@
+"""Retrieval helpers for the Q&A path.
+
+Holds an in-memory BM25 inverted index per collection, maintained
+incrementally at ingest, and reciprocal rank fusion for combining lexical and
+vector rankings. Exact names, numbers and fees ("€15 million", "67,394") are
+matched lexically, which dense MiniLM embeddings often miss. An optional
+cross-encoder pass reranks the fused candidates within a time budget.
+Metadata filters use Chroma's ``where`` syntax everywhere, so the same
+filter scopes the vector store, the BM25 index and the compact store.
+"""
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+
+# Numbers keep their separators/currency ("€15", "67,394", "2.5%"), everything else is \w+
+TOKEN_PATTERN = re.compile(r"[€$£]?\d+(?:[.,]\d+)*%?|\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercased tokens, with bare variants of numbers so "€15" matches "15"."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if token[0] in "€$£" or token[-1] == "%":
+            token = token.strip("€$£%")
+            tokens.append(token)
+        if "," in token:
+            tokens.append(token.replace(",", ""))
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over chunk ids, updated incrementally as chunks are added or removed."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {chunk_id: term frequency}
+        self.doc_lengths = {}              # chunk_id -> number of tokens
+        self.doc_terms = {}                # chunk_id -> distinct terms, for removal
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, chunk_id, text):
+        """Index one chunk (re-adding an id replaces it)."""
+        tokens = tokenize(text)
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+
+        with self._lock:
+            if chunk_id in self.doc_lengths:
+                self._remove(chunk_id)
+            for term, tf in counts.items():
+                self.postings[term][chunk_id] = tf
+            self.doc_lengths[chunk_id] = len(tokens)
+            self.doc_terms[chunk_id] = list(counts)
+            self.total_length += len(tokens)
+
+    def remove(self, chunk_id):
+        with self._lock:
+            self._remove(chunk_id)
+
+    def _remove(self, chunk_id):
+        length = self.doc_lengths.pop(chunk_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(chunk_id):
+            del self.postings[term][chunk_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, query, n_results=10, allowed_ids=None):
+        """Top ``n_results`` (chunk_id, score) pairs; ``allowed_ids`` restricts the candidates."""
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            if not n_docs:
+                return []
+            avg_length = self.total_length / n_docs
+            scores = defaultdict(float)
+
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for chunk_id, tf in docs.items():
+                    if allowed_ids is not None and chunk_id not in allowed_ids:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+
+
+_indexes_lock = threading.Lock()
+_indexes = {}
+
+
+def get_bm25_index(collection_name):
+    """The process-wide BM25 index for ``collection_name``."""
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = BM25Index()
+        return _indexes[collection_name]
+
+
+def reset_bm25_index(collection_name):
+    """Forget the BM25 index for a collection that was deleted or rebuilt."""
+    with _indexes_lock:
+        _indexes.pop(collection_name, None)
+
+
+# Metadata filters (a subset of Chroma's where syntax)
+_COMPARISONS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+# A chunk stored once for several files carries one flag per extra source
+# ("also_in:<filename>" / "also_ext:<extension>": True), since Chroma metadata
+# values must be scalars and where clauses can't match inside strings.
+def source_key(filename):
+    return f"also_in:{filename}"
+
+
+def extension_key(extension):
+    return f"also_ext:{extension}"
+
+
+def _any_of(field, values, flag_key):
+    """Match ``field`` in ``values``, or any chunk flagged as also coming from one of them."""
+    return {"$or": [{field: {"$in": list(values)}}] + [{flag_key(v): True} for v in values]}
+
+
+def build_where(filenames=None, extensions=None, since=None, until=None):
+    """Chroma ``where`` clause for a file / extension / ingest-time scope, or None for everything.
+
+    ``since`` and ``until`` are epoch seconds compared against ``ingested_at``.
+    File and extension scopes also match chunks that were deduplicated
+    against a copy in another file (see ``source_key``).
+    """
+    clauses = []
+    if filenames:
+        clauses.append(_any_of("filename", filenames, source_key))
+    if extensions:
+        clauses.append(_any_of("extension", extensions, extension_key))
+    if since is not None:
+        clauses.append({"ingested_at": {"$gte": since}})
+    if until is not None:
+        clauses.append({"ingested_at": {"$lte": until}})
+
+    if not clauses:
+        return None
+    # Chroma requires $and to have at least two operands
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def matches_where(metadata, where):
+    """True if a chunk's metadata satisfies a Chroma-style ``where`` clause."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, arg in condition.items():
+                if not _COMPARISONS[operator](value, arg):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def reciprocal_rank_fusion(rankings, k=60, weights=None):
+    """Fuse ranked id lists: score(id) = sum(weight / (k + rank)). Returns [(id, score)] best first."""
+    weights = weights or [1.0] * len(rankings)
+    scores = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def rerank_with_budget(cross_encoder, question, passages, top_k, budget_ms, batch_size=8):
+    """Score (question, passage) pairs in batches and keep the best ``top_k``.
+
+    Stops as soon as the time budget is spent and falls back to the incoming
+    (vector / fused) order. Returns (passages, info) where info records how
+    many pairs were scored and whether the fallback was used.
+    """
+    started = time.perf_counter()
+    scores = []
+    for i in range(0, len(passages), batch_size):
+        if (time.perf_counter() - started) * 1000 > budget_ms:
+            break
+        batch = passages[i:i + batch_size]
+        scores.extend(cross_encoder.predict([(question, p["document"]) for p in batch]))
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    info = {"scored": len(scores), "candidates": len(passages), "elapsed_ms": round(elapsed_ms, 2)}
+
+    # A batch only starts inside the budget, so overshoot is bounded by one batch
+    if len(scores) < len(passages):
+        info["fallback"] = True
+        return passages[:top_k], info
+
+    info["fallback"] = False
+    order = sorted(range(len(passages)), key=lambda i: float(scores[i]), reverse=True)
+    reranked = []
+    for i in order[:top_k]:
+        reranked.append({**passages[i], "rerank_score": float(scores[i])})
+    return reranked, info
+
+
+def maximal_marginal_relevance(query_embedding, embeddings, k, lambda_mult=0.7, relevance=None):
+    """Indices of ``k`` embeddings picked by maximal marginal relevance.
+
+    Each step takes the candidate maximising
+    lambda * relevance(d) - (1 - lambda) * max sim(d, already selected),
+    with cosine similarities computed in one matrix product. ``relevance``
+    (higher is better) lets the caller keep its own ranking signal, e.g. the
+    fused or reranked order; without it, cosine similarity to the query is used.
+    """
+    import numpy as np
+
+    docs = np.asarray(embeddings, dtype=np.float32)
+    docs = docs / np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        relevance = docs @ query
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+
+    pairwise = docs @ docs.T
+    k = min(k, len(docs))
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
+
+
+def rank_relevance(ranks):
+    """Relevance from 1-based ranks for MMR: 1/rank, so the top result scores 1."""
+    return [1.0 / rank for rank in ranks]
+
+
+def _overlap_length(left, right, min_overlap=20):
+    """Length of the longest suffix of ``left`` that is also a prefix of ``right``."""
+    if len(left) < min_overlap or len(right) < min_overlap:
+        return 0
+    probe = right[:min_overlap]
+    best = 0
+    start = left.find(probe)
+    while start != -1:
+        size = len(left) - start
+        if size > best and right.startswith(left[start:]):
+            best = size
+            break  # earliest match in ``left`` is the longest overlap
+        start = left.find(probe, start + 1)
+    return best
+
+
+def pack_context(passages, tokenizer, budget_tokens, min_tokens=32):
+    """Pack ranked passages into at most ``budget_tokens`` generator tokens.
+
+    Exact duplicates are dropped, text repeated from a neighbouring chunk (the
+    splitter's overlap) is trimmed, and the last passage that doesn't fit is
+    truncated if at least ``min_tokens`` remain. Returns (context, stats).
+    """
+    def encode(text):
+        return tokenizer.encode(text, add_special_tokens=False)
+
+    packed = []
+    seen = set()
+    stats = {"budget": budget_tokens, "tokens_used": 0, "tokens_dropped": 0,
+             "passages_used": 0, "passages_dropped": 0, "duplicates_removed": 0,
+             "overlap_chars_trimmed": 0, "truncated": False}
+
+    for passage in passages:
+        text = passage["document"].strip()
+        key = " ".join(text.split()).lower()
+        if key in seen:
+            stats["duplicates_removed"] += 1
+            continue
+        seen.add(key)
+
+        # Trim text this passage shares with an already packed one, in either direction
+        for other in packed:
+            trimmed = _overlap_length(other, text)
+            if trimmed:
+                text = text[trimmed:].lstrip()
+                stats["overlap_chars_trimmed"] += trimmed
+            trimmed = _overlap_length(text, other)
+            if trimmed:
+                text = text[:-trimmed].rstrip()
+                stats["overlap_chars_trimmed"] += trimmed
+        if not text:
+            stats["duplicates_removed"] += 1
+            continue
+
+        label = f"Document {len(packed) + 1}: "
+        ids = encode(label + text)
+        remaining = budget_tokens - stats["tokens_used"]
+        if len(ids) <= remaining:
+            packed.append(text)
+            stats["tokens_used"] += len(ids)
+        elif remaining >= min_tokens:
+            label_tokens = len(encode(label))
+            text_ids = encode(text)
+            text = tokenizer.decode(text_ids[:remaining - label_tokens], skip_special_tokens=True)
+            packed.append(text)
+            stats["tokens_used"] += remaining
+            stats["tokens_dropped"] += len(ids) - remaining
+            stats["truncated"] = True
+        else:
+            stats["tokens_dropped"] += len(ids)
+            stats["passages_dropped"] += 1
+
+    stats["passages_used"] = len(packed)
+    context = "\n\n".join(f"Document {i + 1}: {text}" for i, text in enumerate(packed))
+    return context, stats
@@ -0,0 +1,242 @@
+"""Retrieval quality-vs-speed evaluation for the document Q&A path.
+
+Takes a labelled set of question -> expected source filename pairs and sweeps
+top-k, the "no answer" distance threshold, chunk size/overlap and HNSW index
+parameters. For every setting it reports recall@k, MRR, answer rate and query
+latency, so the hard-coded ``n_results=3`` / ``min(distances) > 1.5`` values in
+``get_answer_with_source`` can be chosen from measurements. By default it also
+compares the structure-aware Markdown chunker with the original character
+splitter, including the time spent chunking.
+
+Examples:
+    python retrieval_eval.py --labels labels.jsonl --corpus docs/
+    python retrieval_eval.py --labels labels.jsonl --corpus docs/ \\
+        --top-k 1,3,5,10 --threshold 1.0,1.5,none \\
+        --chunker recursive --chunk-size 400,700,1000 --chunk-overlap 0,100 \\
+        --space l2,cosine --search-ef 10,50,100 --report eval.json
+
+Label files are JSONL with a ``question`` and either ``source`` (one filename)
+or ``sources`` (a list of acceptable filenames).
+"""
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+
+def load_labels(path):
+    """Read question -> expected source filename pairs from JSONL."""
+    labels = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        sources = item.get("sources") or [item["source"]]
+        labels.append({"question": item["question"], "sources": set(sources)})
+    if not labels:
+        raise ValueError(f"No labelled questions found in {path}")
+    return labels
+
+
+def load_corpus(module, corpus_dir):
+    """Read every document under ``corpus_dir`` as text, converting when needed."""
+    corpus = []
+    for file_path in sorted(p for p in Path(corpus_dir).rglob("*") if p.is_file()):
+        if file_path.suffix.lower() in TEXT_EXTENSIONS:
+            text = file_path.read_text(encoding="utf-8", errors="replace")
+        else:
+            text = module.convert_to_markdown(str(file_path))
+        corpus.append((file_path.name, text))
+    if not corpus:
+        raise ValueError(f"No documents found under {corpus_dir}")
+    return corpus
+
+
+def parse_list(value, cast=int):
+    """Parse a comma separated CLI list; ``none`` becomes None."""
+    return [None if item.strip().lower() == "none" else cast(item) for item in value.split(",")]
+
+
+def time_chunking(module, corpus, chunker, chunk_size, chunk_overlap):
+    """Seconds to chunk the whole corpus (no embedding), and the chunk count."""
+    started = time.perf_counter()
+    chunks = sum(1 for _, text in corpus
+                 for _ in module.split_text(text, chunker, chunk_size, chunk_overlap))
+    return time.perf_counter() - started, chunks
+
+
+def build_index(module, corpus, name, chunker, chunk_size, chunk_overlap, index_metadata):
+    """Ingest the corpus into a fresh collection with the given chunking and HNSW settings."""
+    import chromadb
+
+    client = chromadb.Client()
+    try:
+        client.delete_collection(name=name)
+    except Exception:
+        pass
+    client.create_collection(name=name, metadata=index_metadata)
+
+    started = time.perf_counter()
+    collection = None
+    for filename, text in corpus:
+        collection = module.add_text_to_chromadb(text, filename, name, chunk_size=chunk_size,
+                                                 chunk_overlap=chunk_overlap, chunker=chunker)
+    return collection, time.perf_counter() - started
+
+
+def drop_index(module, name):
+    """Delete an evaluation collection and forget the cached handle."""
+    import chromadb
+
+    getattr(module.add_text_to_chromadb, "collections", {}).pop(name, None)
+    try:
+        chromadb.Client().delete_collection(name=name)
+    except Exception:
+        pass
+
+
+def evaluate_queries(collection, labels, top_ks, thresholds, latency_repeats):
+    """Score one index for every top-k / threshold combination."""
+    rows = []
+    for k in top_ks:
+        latencies = []
+        ranked = []
+        for label in labels:
+            for _ in range(latency_repeats):
+                started = time.perf_counter()
+                results = collection.query(query_texts=[label["question"]], n_results=k)
+                latencies.append((time.perf_counter() - started) * 1000)
+            filenames = [meta["filename"] for meta in results["metadatas"][0]]
+            distances = results["distances"][0]
+            ranked.append((label, filenames, distances))
+
+        latencies.sort()
+        for threshold in thresholds:
+            hits = 0
+            reciprocal_ranks = []
+            answered = 0
+            for label, filenames, distances in ranked:
+                # Mirrors the app: no answer at all when even the best hit is too far away
+                gated = not distances or (threshold is not None and min(distances) > threshold)
+                if gated:
+                    reciprocal_ranks.append(0.0)
+                    continue
+                answered += 1
+                rank = next((i + 1 for i, name in enumerate(filenames) if name in label["sources"]), None)
+                hits += rank is not None
+                reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+            rows.append({
+                "top_k": k,
+                "threshold": threshold,
+                "recall_at_k": round(hits / len(labels), 4),
+                "mrr": round(statistics.fmean(reciprocal_ranks), 4),
+                "answer_rate": round(answered / len(labels), 4),
+                "query_p50_ms": round(latencies[len(latencies) // 2], 3),
+                "query_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            })
+    return rows
+
+
+def sweep(args):
+    sys.path.insert(0, str(Path(__file__).parent))
+    module = importlib.import_module("Simonhomework")
+
+    labels = load_labels(args.labels)
+    corpus = load_corpus(module, args.corpus)
+
+    top_ks = parse_list(args.top_k)
+    thresholds = parse_list(args.threshold, float)
+    index_grid = itertools.product(
+        args.chunker.split(","), parse_list(args.chunk_size), parse_list(args.chunk_overlap),
+        args.space.split(","), parse_list(args.m), parse_list(args.search_ef),
+    )
+
+    rows = []
+    for i, (chunker, chunk_size, chunk_overlap, space, m, search_ef) in enumerate(index_grid):
+        # None means the chunker's own default (tokens for markdown, characters for recursive)
+        default_size, default_overlap = module.CHUNKER_DEFAULTS[chunker]
+        chunk_size = chunk_size or default_size
+        chunk_overlap = default_overlap if chunk_overlap is None else chunk_overlap
+        if chunk_overlap >= chunk_size:
+            continue
+        chunk_seconds, _ = time_chunking(module, corpus, chunker, chunk_size, chunk_overlap)
+        index_metadata = {"hnsw:space": space, "hnsw:M": m, "hnsw:search_ef": search_ef}
+        name = f"eval_index_{i}"
+        collection, ingest_seconds = build_index(module, corpus, name, chunker, chunk_size,
+                                                 chunk_overlap, index_metadata)
+        setting = {
+            "chunker": chunker,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "space": space,
+            "hnsw_m": m,
+            "search_ef": search_ef,
+            "chunks": collection.count(),
+            "chunk_seconds": round(chunk_seconds, 4),
+            "ingest_seconds": round(ingest_seconds, 3),
+        }
+        for row in evaluate_queries(collection, labels, top_ks, thresholds, args.latency_repeats):
+            rows.append({**setting, **row})
+        drop_index(module, name)
+        print(f"evaluated chunker={chunker} chunk_size={chunk_size} overlap={chunk_overlap} space={space} "
+              f"M={m} search_ef={search_ef}", file=sys.stderr)
+    return rows
+
+
+def print_table(rows, limit):
+    """Print the best settings: highest recall, then MRR, then lowest latency."""
+    columns = ["recall_at_k", "mrr", "answer_rate", "query_p50_ms", "top_k", "threshold",
+               "chunker", "chunk_size", "chunk_overlap", "chunk_seconds", "space", "hnsw_m",
+               "search_ef", "chunks"]
+    ranked = sorted(rows, key=lambda r: (-r["recall_at_k"], -r["mrr"], r["query_p50_ms"]))
+    print("  ".join(f"{c:>13}" for c in columns))
+    for row in ranked[:limit]:
+        print("  ".join(f"{str(row[c]):>13}" for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep retrieval settings and report recall, MRR and latency.")
+    parser.add_argument("--labels", required=True, help="JSONL of question -> expected source filename")
+    parser.add_argument("--corpus", required=True, help="Directory of documents to index")
+    parser.add_argument("--top-k", default="1,3,5,10")
+    parser.add_argument("--threshold", default="1.0,1.5,none", help="'none' disables the cutoff")
+    parser.add_argument("--chunker", default="markdown,recursive",
+                        help="Chunkers to compare: markdown (token-sized), recursive (character-sized)")
+    parser.add_argument("--chunk-size", default="none",
+                        help="Tokens for markdown, characters for recursive; 'none' = chunker default")
+    parser.add_argument("--chunk-overlap", default="none")
+    parser.add_argument("--space", default="l2", help="HNSW distance: l2, cosine, ip")
+    parser.add_argument("--m", default="16", help="HNSW M (graph degree)")
+    parser.add_argument("--search-ef", default="10", help="HNSW search_ef")
+    parser.add_argument("--latency-repeats", type=int, default=3)
+    parser.add_argument("--show", type=int, default=15, help="Rows to print")
+    parser.add_argument("--report", default="retrieval_eval.json", help=".json or .csv output")
+    args = parser.parse_args(argv)
+
+    rows = sweep(args)
+    if not rows:
+        raise SystemExit("No valid settings in the sweep (chunk overlap must be below chunk size)")
+    report = Path(args.report)
+    if report.suffix == ".csv":
+        with report.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        report.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+    print_table(rows, args.show)
+    print(f"\n{len(rows)} settings written to {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Bounded, self-cleaning scratch space for uploads that must touch disk.
+
+Docling can convert PDFs and Word documents straight from an in-memory
+stream (see conversion.py), so most uploads never reach disk. The rest (and
+older docling versions) get a file from the ScratchSpace:
+
+- every file lives under one directory (SCRATCH_DIR) and is deleted when
+  its ``with`` block exits, even if the conversion raises
+- the bytes in the directory are capped (SCRATCH_QUOTA_MB), counting files
+  written by every process that shares it; a write that would exceed the
+  quota sweeps stale files and tries again, then raises ScratchQuotaExceeded
+  (processes check without a shared lock, so two racing writes can briefly
+  overshoot by one file)
+- files older than SCRATCH_MAX_AGE seconds (left behind by a crashed or
+  killed process) are swept at start-up and on later writes
+- ``write()`` streams a file that outlives the call (an export waiting to
+  be downloaded) under the same quota; the age sweep is what removes it
+
+``metrics()`` reports usage and cleanup counters; health.py includes them in
+the readiness report.
+"""
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+
+DEFAULT_DIR = os.environ.get("SCRATCH_DIR", str(Path(tempfile.gettempdir()) / "streamlitai-scratch"))
+QUOTA_BYTES = int(float(os.environ.get("SCRATCH_QUOTA_MB", "512")) * 2**20)
+MAX_AGE_SECONDS = float(os.environ.get("SCRATCH_MAX_AGE", "3600"))
+SWEEP_INTERVAL = 60.0
+PREFIX = "upload-"
+
+
+class ScratchQuotaExceeded(RuntimeError):
+    """Raised when a scratch file would push usage past the quota."""
+
+
+class ScratchSpace:
+    """Quota-bounded directory of short-lived files."""
+
+    def __init__(self, root=DEFAULT_DIR, quota_bytes=QUOTA_BYTES, max_age=MAX_AGE_SECONDS):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.quota_bytes = quota_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._live = {}               # path -> size of files currently handed out
+        self._last_sweep = 0.0
+        self.counters = {
+            "files_created": 0,
+            "files_removed": 0,
+            "bytes_written": 0,
+            "peak_bytes": 0,
+            "stale_swept": 0,
+            "stale_bytes_swept": 0,
+            "quota_rejections": 0,
+            "in_memory": 0,
+        }
+        self.sweep()
+
+    @property
+    def bytes_in_use(self):
+        with self._lock:
+            return sum(self._live.values())
+
+    def sweep(self, max_age=None):
+        """Delete our files older than ``max_age`` that no live block holds. Returns bytes freed."""
+        max_age = self.max_age if max_age is None else max_age
+        cutoff = time.time() - max_age
+        freed = 0
+        with self._lock:
+            live = set(self._live)
+            self._last_sweep = time.time()
+        for path in self.root.glob(f"{PREFIX}*"):
+            if str(path) in live:
+                continue
+            try:
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            freed += stat.st_size
+            with self._lock:
+                self.counters["stale_swept"] += 1
+                self.counters["stale_bytes_swept"] += stat.st_size
+        return freed
+
+    def _on_disk(self):
+        """{path: size} of our files in the scratch directory, whichever process wrote them."""
+        sizes = {}
+        for path in self.root.glob(f"{PREFIX}*"):
+            try:
+                sizes[str(path)] = path.stat().st_size
+            except OSError:
+                pass
+        return sizes
+
+    def _reserve(self, path, size):
+        on_disk = self._on_disk()
+        with self._lock:
+            # Files on disk, with our live files counted at their full reservation
+            used = (sum(n for p, n in on_disk.items() if p not in self._live)
+                    + sum(self._live.values()))
+            if used + size > self.quota_bytes:
+                return False
+            self._live[path] = self._live.get(path, 0) + size
+            self.counters["peak_bytes"] = max(self.counters["peak_bytes"], used + size)
+            return True
+
+    def _reserve_or_raise(self, path, size):
+        # Stale files count towards the quota until swept, so sweep and retry once
+        if self._reserve(path, size) or (self.sweep() and self._reserve(path, size)):
+            return
+        with self._lock:
+            self.counters["quota_rejections"] += 1
+        raise ScratchQuotaExceeded(
+            f"Scratch space is full ({self.disk_usage()[1] / 2**20:.1f} of "
+            f"{self.quota_bytes / 2**20:.0f} MB in use); try again shortly"
+        )
+
+    def _new_path(self, name):
+        if time.time() - self._last_sweep > SWEEP_INTERVAL:
+            self.sweep()
+        suffix = re.sub(r"[^A-Za-z0-9.]", "", Path(name).suffix)[:16]
+        return str(self.root / f"{PREFIX}{uuid.uuid4().hex}{suffix}")
+
+    def write(self, name, chunks, encoding="utf-8", block_size=2**20):
+        """Stream ``chunks`` (str or bytes) to a scratch file keeping ``name``'s suffix; return its path.
+
+        The file outlives the call: the caller deletes it when done, and the
+        age sweep removes it otherwise. Quota is reserved a block at a time,
+        so an export that outgrows the quota is deleted and raises
+        ScratchQuotaExceeded part-way through.
+        """
+        path = self._new_path(name)
+        written = reserved = 0
+        try:
+            with open(path, "wb") as f:
+                for chunk in chunks:
+                    data = chunk.encode(encoding) if isinstance(chunk, str) else chunk
+                    if written + len(data) > reserved:
+                        step = max(block_size, written + len(data) - reserved)
+                        self._reserve_or_raise(path, step)
+                        reserved += step
+                    f.write(data)
+                    written += len(data)
+        except BaseException:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            raise
+        finally:
+            with self._lock:
+                self._live.pop(path, None)
+        with self._lock:
+            self.counters["files_created"] += 1
+            self.counters["bytes_written"] += written
+        return path
+
+    @contextmanager
+    def file(self, name, data):
+        """Write ``data`` to a scratch file keeping ``name``'s suffix; yield its path, then delete it."""
+        path = self._new_path(name)
+        self._reserve_or_raise(path, len(data))
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+            with self._lock:
+                self.counters["files_created"] += 1
+                self.counters["bytes_written"] += len(data)
+            yield path
+        finally:
+            try:
+                os.remove(path)
+                with self._lock:
+                    self.counters["files_removed"] += 1
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                self._live.pop(path, None)
+
+    def record_in_memory(self):
+        """Count an upload that was converted without touching disk."""
+        with self._lock:
+            self.counters["in_memory"] += 1
+
+    def disk_usage(self):
+        """(files, bytes) actually present in the scratch directory, including other processes'."""
+        sizes = self._on_disk()
+        return len(sizes), sum(sizes.values())
+
+    def metrics(self):
+        files, size = self.disk_usage()
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "quota_bytes": self.quota_bytes,
+                "live_files": len(self._live),
+                "live_bytes": sum(self._live.values()),
+                "disk_files": files,
+                "disk_bytes": size,
+                **self.counters,
+            }
+
+
+_scratch_lock = threading.Lock()
+_scratch = None
+
+
+def get_scratch():
+    """The process-wide scratch space (SCRATCH_DIR)."""
+    global _scratch
+    with _scratch_lock:
+        if _scratch is None:
+            _scratch = ScratchSpace()
+        return _scratch
+
+
+def metrics():
+    """Scratch metrics, or None if nothing in this process has used scratch space yet."""
+    return _scratch.metrics() if _scratch is not None else None
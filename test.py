@@ -1,9 +1,11 @@
 import streamlit as st
 from pathlib import Path
-import tempfile
 from datetime import datetime  # Add this for the search history feature
 import time  # For loading animations
 import base64  # For embedding images
+import os
+import uuid
+from collections import deque
 
 # NameError handling - create a debug function to catch issues
 def debug_log(message):
@@ -19,13 +21,6 @@ except Exception as e:
     debug_log(f"Error importing ChromaDB: {str(e)}")
     st.error(f"Error importing ChromaDB: {str(e)}. Please make sure it's installed with 'pip install chromadb'")
 
-try:
-    from transformers import pipeline
-    debug_log("Transformers pipeline imported successfully")
-except Exception as e:
-    debug_log(f"Error importing Transformers: {str(e)}")
-    st.error(f"Error importing Transformers: {str(e)}. Please make sure it's installed.")
-
 try:
     from sentence_transformers import SentenceTransformer
     debug_log("SentenceTransformer imported successfully")
@@ -40,53 +35,16 @@ except Exception as e:
     debug_log(f"Error importing Langchain: {str(e)}")
     st.error(f"Error importing Langchain: {str(e)}. Please make sure it's installed.")
 
-try:
-    from docling.document_converter import DocumentConverter, PdfFormatOption
-    from docling.backend.docling_parse_v2_backend import DoclingParseV2DocumentBackend
-    from docling.datamodel.base_models import InputFormat
-    from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
-    debug_log("Docling imported successfully")
-except Exception as e:
-    debug_log(f"Error importing Docling: {str(e)}")
-    st.error(f"Error importing Docling: {str(e)}. Please make sure it's installed.")
-    debug_log(f"Error importing Transformers: {str(e)}")
-    st.error(f"Error importing Transformers: {str(e)}. Please make sure it's installed.")
+import model_registry  # Shared, lazily loaded models (transformers loads on the first question)
+import health  # Cheap liveness/readiness probes
+import history_store  # Persistent search history, streamed out by the export
+import conversion  # Shared upload conversion: in-memory where docling allows, managed scratch files otherwise
+import scratch  # Quota-bounded scratch files (exports waiting to be downloaded)
 
 
-# Convert uploaded file to markdown text
+# Convert a file on disk to markdown text (uploads go through conversion.convert_bytes)
 def convert_to_markdown(file_path: str) -> str:
-    path = Path(file_path)
-    ext = path.suffix.lower()
-
-    if ext == ".pdf":
-        pdf_opts = PdfPipelineOptions(do_ocr=False)
-        pdf_opts.accelerator_options = AcceleratorOptions(
-            num_threads=4,
-            device=AcceleratorDevice.CPU
-        )
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_options=pdf_opts,
-                    backend=DoclingParseV2DocumentBackend
-                )
-            }
-        )
-        doc = converter.convert(file_path).document
-        return doc.export_to_markdown(image_mode="placeholder")
-
-    if ext in [".doc", ".docx"]:
-        converter = DocumentConverter()
-        doc = converter.convert(file_path).document
-        return doc.export_to_markdown(image_mode="placeholder")
-
-    if ext == ".txt":
-        try:
-            return path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            return path.read_text(encoding="latin-1", errors="replace")
-
-    raise ValueError(f"Unsupported extension: {ext}")
+    return conversion.convert_file(file_path)
 
 
 # Reset ChromaDB collection
@@ -159,7 +117,7 @@ Instructions: Answer ONLY using the information provided above. If the answer is
 
 Answer:"""
 
-    ai_model = pipeline("text2text-generation", model="google/flan-t5-small")
+    ai_model = model_registry.get_generator("google/flan-t5-small")
     response = ai_model(prompt, max_length=150)
     return response[0]['generated_text'].strip()
 
@@ -188,7 +146,7 @@ Question: {question}
 
 Answer:"""
     
-    ai_model = pipeline("text2text-generation", model="google/flan-t5-small")
+    ai_model = model_registry.get_generator("google/flan-t5-small")
     response = ai_model(prompt, max_length=150)
     
     answer = response[0]['generated_text'].strip()
@@ -239,22 +197,27 @@ def show_document_manager():
                     st.rerun()
 
 # FEATURE 3: Search history
+HISTORY_VIEW_SIZE = 10  # Shown on screen; the export covers the full stored history
+
 def add_to_search_history(question, answer, source):
     """Add search to history"""
     if 'search_history' not in st.session_state:
-        st.session_state.search_history = []
+        st.session_state.search_history = deque(maxlen=HISTORY_VIEW_SIZE)
+    if 'history_id' not in st.session_state:
+        st.session_state.history_id = uuid.uuid4().hex
+    
+    ts = time.time()
+    history_store.get_store().append(question, answer, source,
+                                     session_id=st.session_state.history_id, ts=ts)
     
-    # Add new search to beginning of list
-    st.session_state.search_history.insert(0, {
+    # Add new search to the front; the deque drops the oldest itself
+    st.session_state.search_history.appendleft({
         'question': question,
         'answer': answer,
         'source': source,
-        'timestamp': str(datetime.now().strftime("%H:%M:%S"))
+        'ts': ts,
+        'timestamp': datetime.fromtimestamp(ts).strftime("%H:%M:%S")
     })
-    
-    # Keep only last 10 searches
-    if len(st.session_state.search_history) > 10:
-        st.session_state.search_history = st.session_state.search_history[:10]
 
 def show_search_history():
     """Display search history with a modern chat-like interface"""
@@ -353,7 +316,7 @@ def create_tabbed_interface():
         
         uploaded_files = st.file_uploader(
             "Choose files",
-            type=["pdf", "doc", "docx", "txt"],
+            type=["pdf", "doc", "docx", "pptx", "txt"],
             accept_multiple_files=True,
             key="tab_uploader"
         )
@@ -365,12 +328,7 @@ def create_tabbed_interface():
                 
                 converted_docs = []
                 for file in uploaded_files:
-                    suffix = Path(file.name).suffix
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-                        temp_file.write(file.getvalue())
-                        temp_file_path = temp_file.name
-
-                    text = convert_to_markdown(temp_file_path)
+                    text = conversion.convert_upload(file)
                     converted_docs.append({
                         'filename': file.name,
                         'content': text
@@ -748,18 +706,9 @@ def check_app_health():
         if key not in st.session_state:
             issues.append(f"Missing session state: {key}")
     
-    # Check ChromaDB
-    try:
-        if st.session_state.get('collection'):
-            st.session_state.collection.count()
-    except Exception as e:
-        issues.append(f"Database issue: {e}")
-    
-    # Check AI model
-    try:
-        pipeline("text2text-generation", model="google/flan-t5-small")
-    except Exception as e:
-        issues.append(f"AI model issue: {e}")
+    # Check ChromaDB, model registry state and memory headroom without loading any model
+    report = health.readiness(st.session_state.get('collection'))
+    issues.extend(report["issues"])
     
     return issues
 
@@ -791,38 +740,29 @@ def safe_convert_files(uploaded_files):
                 continue
             
             # Check file type
-            allowed_extensions = ['.pdf', '.doc', '.docx', '.txt']
+            allowed_extensions = ['.pdf', '.doc', '.docx', '.pptx', '.txt']
             file_ext = Path(uploaded_file.name).suffix.lower()
             
             if file_ext not in allowed_extensions:
                 errors.append(f"{uploaded_file.name}: Unsupported file type")
                 continue
             
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-                tmp.write(uploaded_file.getvalue())
-                tmp_path = tmp.name
+            # Convert to markdown (in memory, or via a managed scratch file)
+            data = uploaded_file.getvalue()
+            markdown_content = conversion.convert_bytes(uploaded_file.name, data)
             
-            try:
-                # Convert to markdown
-                markdown_content = convert_to_markdown(tmp_path)
-                
-                # Validate content
-                if len(markdown_content.strip()) < 10:
-                    errors.append(f"{uploaded_file.name}: File appears to be empty or corrupted")
-                    continue
-                
-                # Store successful conversion
-                converted_docs.append({
-                    'filename': uploaded_file.name,
-                    'content': markdown_content,
-                    'size': len(uploaded_file.getvalue()),
-                    'word_count': len(markdown_content.split())
-                })
-                
-            finally:
-                # Always cleanup temp file
-                Path(tmp_path).unlink(missing_ok=True)
+            # Validate content
+            if len(markdown_content.strip()) < 10:
+                errors.append(f"{uploaded_file.name}: File appears to be empty or corrupted")
+                continue
+            
+            # Store successful conversion
+            converted_docs.append({
+                'filename': uploaded_file.name,
+                'content': markdown_content,
+                'size': len(data),
+                'word_count': len(markdown_content.split())
+            })
                 
         except Exception as e:
             errors.append(f"{uploaded_file.name}: {str(e)}")
@@ -1041,36 +981,69 @@ def show_personality_selector():
     st.sidebar.markdown("</div>", unsafe_allow_html=True)
 
 # FEATURE 10: Export conversation history
+def _day_bounds(dates):
+    """Epoch seconds for the start of the first and end of the last selected day."""
+    if not isinstance(dates, (list, tuple)):
+        dates = [dates]
+    dates = [d for d in dates if d]
+    if not dates:
+        return None, None
+    since = datetime.combine(dates[0], datetime.min.time()).timestamp()
+    until = datetime.combine(dates[-1], datetime.max.time()).timestamp()
+    return since, until
+
+def _discard_export():
+    """Delete the temp file of a previous export."""
+    path = st.session_state.pop('export_path', None)
+    if path and os.path.exists(path):
+        os.remove(path)
+
 def show_export_option():
     """Show option to export conversation history"""
-    if 'search_history' in st.session_state and st.session_state.search_history:
-        st.sidebar.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
-        st.sidebar.markdown("### 📤 Export Conversation")
-        
-        if st.sidebar.button("Export History as Text", key="export_btn"):
-            # Generate export text
-            export_text = "# Simon's AI Assistant - Conversation History\n\n"
-            export_text += f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            
-            for i, search in enumerate(st.session_state.search_history):
-                export_text += f"## Conversation {i+1} ({search['timestamp']})\n\n"
-                export_text += f"**Q:** {search['question']}\n\n"
-                export_text += f"**A:** {search['answer']}\n\n"
-                export_text += f"**Source:** {search['source']}\n\n"
-                export_text += "---\n\n"
-            
-            # Create download link
-            b64 = base64.b64encode(export_text.encode()).decode()
-            href = f'<a href="data:text/plain;base64,{b64}" download="conversation_history.txt">Download Conversation History</a>'
-            st.sidebar.markdown(href, unsafe_allow_html=True)
-            st.sidebar.success("Ready to download!")
-        
-        st.sidebar.markdown("</div>", unsafe_allow_html=True)
+    store = history_store.get_store()
+    # Only this session's conversations: the history table holds every user's
+    session_id = st.session_state.get('history_id')
+    if session_id is None or not store.count(session_id=session_id):
+        return
+    
+    st.sidebar.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
+    st.sidebar.markdown("### 📤 Export Conversation")
+    
+    fmt = st.sidebar.selectbox("Format", list(history_store.EXPORT_FORMATS), key="export_format")
+    today = datetime.now().date()
+    dates = st.sidebar.date_input("Date range", value=(today, today), key="export_dates")
+    since, until = _day_bounds(dates)
+    
+    if st.sidebar.button("Prepare Export", key="export_btn"):
+        # Written to disk by a generator over the store, never built as one string
+        _discard_export()
+        try:
+            path, count = history_store.export_to_file(
+                store, fmt, since, until, session_id,
+                title="Simon's AI Assistant - Conversation History")
+            st.session_state.export_path = path
+            st.session_state.export_count = count
+        except scratch.ScratchQuotaExceeded as e:
+            st.sidebar.warning(str(e))
+    
+    path = st.session_state.get('export_path')
+    if path and os.path.exists(path):
+        extension, mime = history_store.EXPORT_FORMATS[fmt]
+        if path.endswith(f".{extension}"):
+            st.sidebar.caption(f"{st.session_state.export_count} conversations")
+            with open(path, "rb") as f:
+                st.sidebar.download_button("Download Conversation History", data=f,
+                                           file_name=f"conversation_history.{extension}",
+                                           mime=mime, key="export_download")
+    
+    st.sidebar.markdown("</div>", unsafe_allow_html=True)
 
 # MAIN APP
 def main():
     try:
         debug_log("Starting app...")
+        # Expose /livez and /readyz for an orchestrator when HEALTH_PORT is set
+        health.start_health_server()
         # Apply custom CSS for modern theme
         add_custom_css()
         
@@ -1124,7 +1097,10 @@ def main():
             st.session_state.collection = setup_documents()
         
         if 'search_history' not in st.session_state:
-            st.session_state.search_history = []
+            st.session_state.search_history = deque(maxlen=HISTORY_VIEW_SIZE)
+        
+        if 'history_id' not in st.session_state:
+            st.session_state.history_id = uuid.uuid4().hex
         
         if 'ai_personality' not in st.session_state:
             st.session_state.ai_personality = "helpful"
@@ -1138,10 +1114,10 @@ def main():
             # File uploader with better description
             uploaded_files = st.file_uploader(
                 "Select documents to add to your knowledge base",
-                type=["pdf", "doc", "docx", "txt"],
+                type=["pdf", "doc", "docx", "pptx", "txt"],
                 accept_multiple_files=True,
                 key="enhanced_uploader",
-                help="Supported formats: PDF, Word documents, and text files"
+                help="Supported formats: PDF, Word documents, PowerPoint decks, and text files"
             )
             
             # Improved conversion button
@@ -1190,7 +1166,7 @@ def main():
                         debug_log(f"Error in question answering: {str(e)}")
                 
                 if clear_button:
-                    st.session_state.search_history = []
+                    st.session_state.search_history = deque(maxlen=HISTORY_VIEW_SIZE)
                     st.success("Search history cleared!")
                 
                 # Show search history
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import vector_store
+
+
+@pytest.fixture(params=vector_store.MODES)
+def collection(request, tmp_path):
+    collection = vector_store.CompactCollection("docs", mode=request.param, directory=str(tmp_path))
+    yield collection
+    collection.close()
+
+
+def test_query_empty_collection_returns_one_list_per_query(collection):
+    result = collection.query(np.ones((2, 4)), n_results=3,
+                              include=("documents", "metadatas", "distances", "embeddings"))
+    for key in ("ids", "documents", "metadatas", "distances", "embeddings"):
+        assert result[key] == [[], []]
+
+
+def test_query_with_unmatched_filter_returns_one_list_per_query(collection):
+    collection.add(ids=["a", "b"], embeddings=np.eye(2, 4).tolist(), documents=["one", "two"],
+                   metadatas=[{"filename": "a.txt"}, {"filename": "b.txt"}])
+    result = collection.query([[1, 0, 0, 0]], n_results=2, where={"filename": "missing.txt"},
+                              include=("documents", "distances", "embeddings"))
+    assert result["ids"] == [[]]
+    assert result["embeddings"] == [[]]
+    assert result["distances"] == [[]]
+    assert result["metadatas"] is None
+
+
+def test_query_with_matching_filter_returns_embeddings(collection):
+    collection.add(ids=["a", "b"], embeddings=np.eye(2, 4).tolist(), documents=["one", "two"],
+                   metadatas=[{"filename": "a.txt"}, {"filename": "b.txt"}])
+    result = collection.query([[1, 0, 0, 0]], n_results=2, where={"filename": "b.txt"},
+                              include=("documents", "embeddings"))
+    assert result["ids"] == [["b"]]
+    assert np.allclose(result["embeddings"][0], [[0, 1, 0, 0]])
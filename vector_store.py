@@ -0,0 +1,289 @@
+"""Compact NumPy vector store: float16 or int8 vectors with float32 rescoring.
+
+Chroma keeps every chunk as a float32 vector (1.5 KB for 384 dims) plus its
+HNSW graph. For multi-million-chunk corpora this store keeps the vectors it
+scans in memory at reduced precision:
+
+- "float16": half-precision copy, 2x smaller
+- "int8":    scalar-quantized with one float32 scale per vector, ~4x smaller
+
+The float32 originals are appended to a memory-mapped file on disk and only
+the top candidates of each query are read back and rescored exactly, so the
+returned distances are the same squared L2 distances Chroma reports.
+
+``CompactVectorClient`` and ``CompactCollection`` mirror the parts of the
+Chroma client/collection API the apps use (create/get/delete collections,
+add, update, query, get, count, ``where`` filters), so either can sit behind
+``add_text_to_chromadb``.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+import numpy as np
+
+import retrieval
+
+
+MODES = ("float16", "int8")
+
+# Rows upcast to float32 at a time while scanning (keeps the scan's scratch memory small)
+SCAN_BLOCK_ROWS = 16384
+
+
+class CompactCollection:
+    """Duck-typed stand-in for a Chroma collection backed by NumPy arrays."""
+
+    def __init__(self, name, mode="float16", directory=None, rescore_factor=4, metadata=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown vector store mode: {mode!r} (expected one of {MODES})")
+        self.name = name
+        self.mode = mode
+        self.metadata = metadata or {}
+        self.rescore_factor = rescore_factor
+
+        self._dir = directory or tempfile.gettempdir()
+        self._path = os.path.join(self._dir, f"{name}-{uuid.uuid4().hex}.f32")
+        self._lock = threading.Lock()
+
+        self._dim = None
+        self._size = 0
+        self._vectors = None     # (capacity, dim) float16 or int8
+        self._scales = None      # (capacity,) float32, int8 mode only
+        self._norms = None       # (capacity,) float32 squared norms of the originals
+        self._originals = None   # read-only memmap of the float32 file, rebuilt after adds
+
+        self._ids = []
+        self._rows = {}          # id -> row
+        self._documents = []
+        self._metadatas = []
+
+    # Storage
+    def _grow(self, needed):
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, int(capacity * 1.5), 1024)
+        dtype = np.float16 if self.mode == "float16" else np.int8
+        vectors = np.empty((capacity, self._dim), dtype=dtype)
+        norms = np.empty(capacity, dtype=np.float32)
+        if self._size:
+            vectors[:self._size] = self._vectors[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+        self._vectors, self._norms = vectors, norms
+        if self.mode == "int8":
+            scales = np.empty(capacity, dtype=np.float32)
+            if self._size:
+                scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+
+    def _quantize(self, batch):
+        if self.mode == "float16":
+            return batch.astype(np.float16), None
+        scales = np.abs(batch).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(batch / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _original_rows(self, rows):
+        if self._originals is None:
+            self._originals = np.memmap(self._path, dtype=np.float32, mode="r",
+                                        shape=(self._size, self._dim))
+        return np.asarray(self._originals[rows])
+
+    # Chroma-compatible API
+    def count(self):
+        return self._size
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        """Append vectors; ids that already exist are skipped, as Chroma does."""
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._lock:
+            keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in self._rows]
+            if not keep:
+                return
+            batch = np.asarray(embeddings, dtype=np.float32)[keep]
+            if self._dim is None:
+                self._dim = batch.shape[1]
+            elif batch.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {batch.shape[1]} does not match collection "
+                                 f"dimensionality {self._dim}")
+
+            self._grow(self._size + len(keep))
+            quantized, scales = self._quantize(batch)
+            start, end = self._size, self._size + len(keep)
+            self._vectors[start:end] = quantized
+            self._norms[start:end] = np.einsum("ij,ij->i", batch, batch)
+            if scales is not None:
+                self._scales[start:end] = scales
+
+            with open(self._path, "ab") as f:
+                f.write(batch.tobytes())
+            self._originals = None
+
+            for row, i in enumerate(keep, start=start):
+                self._rows[ids[i]] = row
+                self._ids.append(ids[i])
+                self._documents.append(documents[i])
+                self._metadatas.append(metadatas[i])
+            self._size = end
+
+    def update(self, ids, metadatas=None, documents=None):
+        """Replace metadata and/or documents of stored chunks (vectors are left as they are)."""
+        with self._lock:
+            for i, chunk_id in enumerate(ids):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    continue
+                if metadatas is not None:
+                    self._metadatas[row] = metadatas[i]
+                if documents is not None:
+                    self._documents[row] = documents[i]
+
+    def _approximate_distances(self, query, rows=None):
+        """Squared L2 distances from the compact vectors, scanned block by block."""
+        size = self._size if rows is None else len(rows)
+        distances = np.empty(size, dtype=np.float32)
+        query_norm = float(query @ query)
+        for start in range(0, size, SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, size)
+            index = slice(start, end) if rows is None else rows[start:end]
+            dots = self._vectors[index].astype(np.float32) @ query
+            if self.mode == "int8":
+                dots *= self._scales[index]
+            distances[start:end] = self._norms[index] + query_norm - 2 * dots
+        return distances
+
+    def _filter_rows(self, where):
+        """Row numbers whose metadata matches ``where`` (None = no filter)."""
+        if not where:
+            return None
+        return np.fromiter((row for row in range(self._size)
+                            if retrieval.matches_where(self._metadatas[row], where)), dtype=np.int64)
+
+    def query(self, query_embeddings, n_results=10, where=None,
+              include=("documents", "metadatas", "distances")):
+        """Nearest neighbours by squared L2, in Chroma's batched result shape.
+
+        ``where`` is applied before the scan, so only matching rows are scored.
+        """
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        with self._lock:
+            rows = self._filter_rows(where)
+            for query in np.asarray(query_embeddings, dtype=np.float32):
+                if not self._size or (rows is not None and not len(rows)):
+                    # Still one (empty) list per query, as Chroma returns
+                    top, exact = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+                    result["embeddings"].append([])
+                else:
+                    approx = self._approximate_distances(query, rows)
+                    k = min(len(approx), n_results)
+                    pool = min(len(approx), max(k * self.rescore_factor, k))
+                    candidates = np.argpartition(approx, pool - 1)[:pool]
+                    if rows is not None:
+                        candidates = rows[candidates]
+                    candidates.sort()  # sequential reads from the memmap
+
+                    originals = self._original_rows(candidates)
+                    exact = ((originals - query) ** 2).sum(axis=1)
+                    order = np.argsort(exact)[:k]
+                    top, exact = candidates[order], exact[order]
+                    result["embeddings"].append(originals[order].tolist() if "embeddings" in include else [])
+
+                result["ids"].append([self._ids[r] for r in top])
+                result["documents"].append([self._documents[r] for r in top])
+                result["metadatas"].append([self._metadatas[r] for r in top])
+                result["distances"].append(exact.tolist())
+
+        for key in ("documents", "metadatas", "distances", "embeddings"):
+            if key not in include:
+                result[key] = None
+        return result
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None):
+        """Fetch stored chunks by id and/or metadata filter (all chunks when both are None)."""
+        with self._lock:
+            rows = range(self._size) if ids is None else [self._rows[i] for i in ids if i in self._rows]
+            if where:
+                rows = [r for r in rows if retrieval.matches_where(self._metadatas[r], where)]
+            rows = list(rows)[:limit]
+            result = {
+                "ids": [self._ids[r] for r in rows],
+                "documents": [self._documents[r] for r in rows] if "documents" in include else None,
+                "metadatas": [self._metadatas[r] for r in rows] if "metadatas" in include else None,
+                "embeddings": None,
+            }
+            if "embeddings" in include:
+                result["embeddings"] = self._original_rows(rows).tolist() if rows else []
+        return result
+
+    def memory_bytes(self):
+        """In-memory vector bytes: allocated arrays and the part holding live rows."""
+        arrays = [a for a in (self._vectors, self._scales, self._norms) if a is not None]
+        allocated = sum(a.nbytes for a in arrays)
+        used = sum(a[:self._size].nbytes for a in arrays)
+        return {"allocated": allocated, "used": used,
+                "bytes_per_vector": round(used / self._size, 1) if self._size else None,
+                "disk_float32": self._size * (self._dim or 0) * 4}
+
+    def close(self):
+        """Release the arrays and remove the on-disk originals."""
+        with self._lock:
+            self._originals = None
+            self._vectors = self._scales = self._norms = None
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+
+
+class CompactVectorClient:
+    """Minimal Chroma-client look-alike holding CompactCollections."""
+
+    def __init__(self, mode="float16", directory=None, rescore_factor=4):
+        self.mode = mode
+        self.rescore_factor = rescore_factor
+        self.directory = directory or tempfile.mkdtemp(prefix="vector_store_")
+        os.makedirs(self.directory, exist_ok=True)
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def get_collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                raise ValueError(f"Collection {name} does not exist.")
+            return self._collections[name]
+
+    def create_collection(self, name, metadata=None):
+        with self._lock:
+            if name in self._collections:
+                raise ValueError(f"Collection {name} already exists.")
+            collection = CompactCollection(name, self.mode, self.directory, self.rescore_factor, metadata)
+            self._collections[name] = collection
+            return collection
+
+    def get_or_create_collection(self, name, metadata=None):
+        try:
+            return self.get_collection(name)
+        except ValueError:
+            return self.create_collection(name, metadata)
+
+    def delete_collection(self, name):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection is None:
+            raise ValueError(f"Collection {name} does not exist.")
+        collection.close()
+
+    def list_collections(self):
+        with self._lock:
+            return list(self._collections.values())
+
+    def close(self):
+        for collection in self.list_collections():
+            self.delete_collection(collection.name)
+        shutil.rmtree(self.directory, ignore_errors=True)